@@ -1,35 +1,95 @@
 # main.py
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query
+import os
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import List, Optional
 from datetime import datetime
-from app.src.web_crawler.indexer.indexer import init_db, db_connect
+from app.src.web_crawler.indexer.indexer import init_db, db_connect, search_pages_cursor, SearchIndexer, refresh_after_crawl
+from app.src.web_crawler.indexer.pagination import CursorError
 from app.models.models import RegisterModel, CrawlRequest, SearchResponseItem
 from app.src.auth.auth import create_jwt, hash_password, verify_password
-from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
-from app.utils.utils import extract_faqs
-from app.src.semantic_using_NLP.semantic import build_embeddings, semantic_rank
-from app.utils.scheduler import AutoRefresher
+from app.utils.scheduler import AutoRefresher, IndexMaintainer
+from app.utils import metrics
+from app.routers import search_route, user_route
+# crawler (requests, bs4) and semantic (scikit-learn, scipy) are imported
+# inside the handlers / warm-up thread so the server starts accepting quickly
+
+# set KB_AUTOREFRESH=0 to run without the periodic crawler (benchmarks, tests)
+AUTOREFRESH = os.environ.get("KB_AUTOREFRESH", "1") != "0"
 
 app = FastAPI(title="KnowledgeBridge - Crawler + Semantic Search API")
+# suggestions, feed, stats and user history (crawler_route is not mounted:
+# its POST /crawl/start would shadow the one below)
+app.include_router(search_route.router)
+app.include_router(user_route.router)
+
+# set once the semantic partitions are loaded and a query has been scored
+_search_ready = threading.Event()
+_warmup_error = None
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    # stages timed anywhere below (threadpool included) land in this list
+    stages = metrics.start_request()
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - t0
+    route = request.scope.get("route")
+    metrics.observe("http_request_seconds", total, method=request.method,
+                    path=getattr(route, "path", "unmatched"), status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing(stages, total)
+    return response
 
-# start DB and embeddings on startup
+def _warm_up_suggest():
+    try:
+        with metrics.timer("warm_up_suggest"):
+            SearchIndexer()._build_inverted_index()
+    except Exception as e:
+        print(f"[startup] suggestion index failed: {e}")
+
+def _warm_up():
+    """Import the NLP stack, load (or build) embeddings and score one query; the suggestion trie builds alongside."""
+    global _warmup_error
+    # /ready waits on embeddings only; a /suggest before the trie is done
+    # gets the titles indexed so far
+    threading.Thread(target=_warm_up_suggest, name="warm-up-suggest", daemon=True).start()
+    try:
+        with metrics.timer("warm_up"):
+            from app.src.semantic_using_NLP.semantic import hybrid_rank
+            from app.src.semantic_using_NLP.rebuild import get_coordinator
+            # load embeddings, building them only if missing (empty ok); the
+            # build lock keeps several workers from fitting the same partitions
+            get_coordinator().build_now(reason="startup")
+            hybrid_rank("warm up", [], top_k=1)
+        _search_ready.set()
+    except Exception as e:
+        _warmup_error = str(e)
+        print(f"[startup] warm-up failed: {e}")
+    if AUTOREFRESH:
+        # start auto refresher with default config (optional: adjust categories/keywords)
+        global _autoref
+        _autoref = AutoRefresher(interval=60*60*6)  # every 6 hours
+        _autoref.start()
+        global _maintainer
+        _maintainer = IndexMaintainer()  # hourly, ~2 s of work per pass
+        _maintainer.start()
+
+# start DB on startup; embeddings warm up in the background
 @app.on_event("startup")
 def startup_event():
     init_db()
-    # initial build of embeddings (empty ok)
-    build_embeddings()
-    # start auto refresher with default config (optional: adjust categories/keywords)
-    global _autoref
-    _autoref = AutoRefresher(interval=60*60*6)  # every 6 hours
-    _autoref.start()
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
 
 @app.on_event("shutdown")
 def shutdown_event():
-    try:
-        _autoref.stop()
-    except Exception:
-        pass
+    for worker in ("_autoref", "_maintainer"):
+        try:
+            globals()[worker].stop()
+        except Exception:
+            pass
 
 @app.post("/auth/register")
 def register(payload: RegisterModel):
@@ -58,88 +118,47 @@ def login(form: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": token, "token_type": "bearer"}
 
 @app.post("/crawl/start", response_model=List[dict])
-def start_crawl(req: CrawlRequest, background: BackgroundTasks):
+def start_crawl(req: CrawlRequest):
+    from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+    from app.src.semantic_using_NLP.rebuild import get_coordinator
     crawler = EnhancedCrawler()
     stored = crawler.crawl(categories=req.categories, keywords=req.keywords, max_pages=req.max_pages)
-    # rebuild semantic embeddings in background
-    background.add_task(build_embeddings, True)
+    # new titles/schemes into the suggestion trie, refresh affected feeds
+    refresh_after_crawl()
+    # debounced background rebuild; bursts of crawls share one refit
+    if stored:
+        get_coordinator().request("crawl")
     return stored
 
 @app.get("/search", response_model=List[SearchResponseItem])
-def search(q: str = Query(..., min_length=1), category: Optional[str] = None, lang: Optional[str] = None, limit: int = 20):
+def search(response: Response, q: str = Query(..., min_length=1), category: Optional[str] = None,
+           lang: Optional[str] = None, limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
     """
     Combined search:
     - Use SQLite FTS5 to get candidate doc ids matching query (fast)
-    - Use semantic TF-IDF re-ranking among candidates to produce relevance score
-    """
-    conn = db_connect()
-    cur = conn.cursor()
-    # Use FTS5 MATCH to find candidates
-    fts_query = q.replace('"', ' ')  # basic sanitize
-    sql = """
-    SELECT p.id, p.url, p.title, p.summary, p.category, p.language
-    FROM pages_fts f
-    JOIN pages p ON f.rowid = p.id
-    WHERE pages_fts MATCH ?
+    - Use semantic TF-IDF re-ranking among candidates to produce relevance score;
+      lang/category filters only touch the matching semantic partitions
+    - Merge in dense (LSA/IVF) nearest neighbours so pages without a literal
+      match can still be found
+    Paging: pass the X-Next-Cursor response header back as ?cursor= (same q,
+    category and lang). A cursor stops working once the index is rebuilt (400).
     """
-    params = [fts_query + "*"]
-    if category:
-        sql += " AND p.category = ?"
-        params.append(category)
-    if lang:
-        sql += " AND p.language = ?"
-        params.append(lang)
-    sql += " LIMIT ?"
-    params.append(limit * 5)  # get more candidates to re-rank semantically
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    candidate_ids = [r["id"] for r in rows]
-    # If no candidates from FTS, fallback to simple LIKE search
-    if not candidate_ids:
-        like_q = f"%{q}%"
-        sql2 = "SELECT id, url, title, summary, category, language FROM pages WHERE (title LIKE ? OR summary LIKE ? OR content LIKE ?)"
-        params2 = [like_q, like_q, like_q]
-        if category:
-            sql2 += " AND category = ?"
-            params2.append(category)
-        if lang:
-            sql2 += " AND language = ?"
-            params2.append(lang)
-        sql2 += " LIMIT ?"
-        params2.append(limit * 5)
-        cur.execute(sql2, params2)
-        rows = cur.fetchall()
-        candidate_ids = [r["id"] for r in rows]
-    # If still no candidates, return empty list
-    if not candidate_ids:
-        conn.close()
-        return []
-    # Semantic re-ranking
-    scored = semantic_rank(q, candidate_ids, top_k=limit)
-    # build response items preserving order by score
-    ordered_ids = [doc_id for doc_id, score in scored]
-    # fetch details for ordered ids
-    placeholders = ",".join("?" for _ in ordered_ids)
-    cur.execute(f"SELECT id, url, title, summary, category, language FROM pages WHERE id IN ({placeholders})", ordered_ids)
-    docs = {r["id"]: r for r in cur.fetchall()}
-    results = []
-    for doc_id, score in scored:
-        r = docs.get(doc_id)
-        if not r:
-            continue
-        results.append({
-            "url": r["url"],
-            "title": r["title"] or "",
-            "summary": r["summary"] or "",
-            "category": r["category"] or "",
-            "language": r["language"] or "english",
-            "score": round(score, 6)
-        })
-    conn.close()
+    with metrics.profile_if_slow("search"):
+        results, next_cursor = _search(q, category, lang, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
+def _search(q: str, category: Optional[str], lang: Optional[str], limit: int, cursor: Optional[str] = None):
+    # until warm-up finishes, keep FTS order instead of blocking on the NLP stack
+    try:
+        return search_pages_cursor(q, category, lang, limit, cursor, rank=_search_ready.is_set())
+    except CursorError as e:
+        raise HTTPException(400, str(e))
+
 @app.get("/cache/export")
 def export_cache(category: Optional[str] = None, limit: int = 200):
+    from app.utils.utils import extract_faqs
     conn = db_connect()
     cur = conn.cursor()
     if category:
@@ -166,3 +185,15 @@ def export_cache(category: Optional[str] = None, limit: int = 200):
 @app.get("/health")
 def health():
     return {"ok": True, "time": datetime.utcnow().isoformat()}
+
+@app.get("/ready")
+def ready():
+    """200 once search is warm (embeddings loaded); 503 before that."""
+    body = {"ready": _search_ready.is_set(), "error": _warmup_error}
+    if not body["ready"]:
+        return JSONResponse(body, status_code=503)
+    return body
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
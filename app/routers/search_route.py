@@ -26,7 +26,7 @@ class FeedResponse(BaseModel):
     user_interests: List[str]
 
 @router.post("/search", response_model=SearchResponse)
-async def search_content(request: SearchRequest):
+def search_content(request: SearchRequest):
     try:
         results = search_engine.search(
             query=request.query,
@@ -47,7 +47,7 @@ async def search_content(request: SearchRequest):
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 @router.get("/search/suggestions")
-async def get_suggestions(
+def get_suggestions(
     query: str = Query(..., min_length=1),
     user_id: str = Query("default")
 ):
@@ -58,7 +58,7 @@ async def get_suggestions(
         raise HTTPException(status_code=500, detail=f"Suggestion error: {str(e)}")
 
 @router.post("/feed", response_model=FeedResponse)
-async def get_personalized_feed(request: FeedRequest):
+def get_personalized_feed(request: FeedRequest):
     try:
         feed_items = search_engine.get_personalized_feed(
             user_id=request.user_id,
@@ -76,7 +76,7 @@ async def get_personalized_feed(request: FeedRequest):
         raise HTTPException(status_code=500, detail=f"Feed error: {str(e)}")
 
 @router.get("/stats")
-async def get_engine_stats():
+def get_engine_stats():
     try:
         stats = search_engine.indexer.get_statistics()
         return stats
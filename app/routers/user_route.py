@@ -18,7 +18,7 @@ class SearchHistoryItem(BaseModel):
     timestamp: str
 
 @router.post("/users/{user_id}/profile")
-async def update_user_profile(user_id: str, profile: UserProfile):
+def update_user_profile(user_id: str, profile: UserProfile):
     try:
         # In a real application, you'd store this in database
         return {
@@ -30,7 +30,7 @@ async def update_user_profile(user_id: str, profile: UserProfile):
         raise HTTPException(status_code=500, detail=f"Profile update error: {str(e)}")
 
 @router.get("/users/{user_id}/history")
-async def get_user_search_history(user_id: str, limit: int = 20):
+def get_user_search_history(user_id: str, limit: int = 20):
     try:
         history = search_engine._get_user_search_history(user_id, limit)
         return {"user_id": user_id, "search_history": history}
@@ -38,7 +38,7 @@ async def get_user_search_history(user_id: str, limit: int = 20):
         raise HTTPException(status_code=500, detail=f"History error: {str(e)}")
 
 @router.get("/users/{user_id}/interests")
-async def get_user_interests(user_id: str):
+def get_user_interests(user_id: str):
     try:
         interests = search_engine._get_user_interests(user_id)
         return {"user_id": user_id, "interests": interests}
@@ -46,7 +46,7 @@ async def get_user_interests(user_id: str):
         raise HTTPException(status_code=500, detail=f"Interests error: {str(e)}")
 
 @router.delete("/users/{user_id}/history")
-async def clear_user_history(user_id: str):
+def clear_user_history(user_id: str):
     try:
         search_engine._clear_user_history(user_id)
         return {"message": "Search history cleared successfully"}
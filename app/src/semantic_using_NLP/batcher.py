@@ -0,0 +1,58 @@
+# batcher.py
+# Micro-batching: callers block in submit() while a worker thread gathers
+# everything that arrives within a short window and runs it as one batch.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Wraps batch_fn(list_of_items) -> list_of_results (same order).
+    submit(item) returns the item's own result; items arriving within
+    window_ms of the first one (up to max_batch) share a single batch_fn call.
+    """
+
+    def __init__(self, batch_fn, window_ms=3.0, max_batch=32, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item, timeout=None):
+        fut = Future()
+        self._queue.put((item, fut))
+        return fut.result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_loop(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
@@ -0,0 +1,138 @@
+# rebuild.py
+# Coordinates embedding rebuilds so crawls never cost more refits than needed:
+#   - request() is debounced: a build starts once no new request arrived for
+#     DEBOUNCE_SECONDS (but at most MAX_DELAY_SECONDS after the first one)
+#   - single-flight: one build at a time per process; requests arriving while
+#     it runs fold into exactly one follow-up build
+#   - an exclusive file lock in EMBED_DIR serializes builds across uvicorn
+#     workers; whoever gets it second finds the fingerprints unchanged
+#   - partitions whose page set is unchanged are not refitted (fingerprints)
+#   - publishing stays atomic (store.write_partition swaps CURRENT)
+import os
+import threading
+import time
+from contextlib import contextmanager
+from app.utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows: in-process single-flight only
+    fcntl = None
+
+DEBOUNCE_SECONDS = 30.0
+MAX_DELAY_SECONDS = 300.0
+LOCK_FILE = ".rebuild.lock"
+
+
+@contextmanager
+def build_lock(embed_dir):
+    """Exclusive cross-process lock on <embed_dir>/.rebuild.lock (blocking)."""
+    os.makedirs(embed_dir, exist_ok=True)
+    with open(os.path.join(embed_dir, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            t0 = time.perf_counter()
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            metrics.observe("rebuild_lock_wait_seconds", time.perf_counter() - t0)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class RebuildCoordinator:
+    """Debounced, single-flight rebuilds in a background thread (see module comment)."""
+
+    def __init__(self, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._first_request = None   # monotonic time of the oldest pending request
+        self._last_request = None
+        self._reasons = []
+        self._running = False
+        self._thread = None
+        self.builds = 0
+        self.requests = 0
+
+    def request(self, reason="crawl"):
+        """Ask for a rebuild soon; returns immediately."""
+        now = time.monotonic()
+        with self._cond:
+            self.requests += 1
+            metrics.inc("rebuild_requests", reason=reason)
+            if self._first_request is None:
+                self._first_request = now
+            else:
+                metrics.inc("rebuild_coalesced")
+            self._last_request = now
+            self._reasons.append(reason)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_loop, name="embeddings-rebuild", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _due(self, now):
+        return min(self._last_request + self.debounce, self._first_request + self.max_delay) - now
+
+    def _run_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._first_request is None:
+                        self._thread = None
+                        return
+                    wait = self._due(time.monotonic())
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                reasons = self._reasons
+                self._first_request = self._last_request = None
+                self._reasons = []
+                self._running = True
+            try:
+                self.build_now(force_rebuild=True, reason=",".join(sorted(set(reasons))))
+            except Exception as e:
+                metrics.inc("rebuild_errors")
+                print(f"[rebuild] error: {e}")
+            finally:
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+
+    def build_now(self, force_rebuild=False, reason="manual"):
+        """
+        Build in the calling thread under the cross-process lock. With
+        force_rebuild=False this loads what another worker already published.
+        """
+        from app.src.semantic_using_NLP import semantic
+        with build_lock(semantic.EMBED_DIR):
+            t0 = time.perf_counter()
+            parts = semantic.build_embeddings(force_rebuild=force_rebuild)
+            self.builds += 1
+            metrics.inc("rebuild_runs")
+            print(f"[rebuild] {reason}: {len(parts)} partitions ready in {time.perf_counter() - t0:.2f}s")
+        return parts
+
+    def wait_idle(self, timeout=None):
+        """Block until no build is pending or running (tests / benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._running or self._first_request is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 1.0)
+        return True
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_coordinator():
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = RebuildCoordinator()
+        return _coordinator
@@ -1,26 +1,133 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import joblib
-import os
+import hashlib
+import numpy as np
+import re
+import threading
 from app.src.web_crawler.indexer.indexer import db_connect
-from scipy.sparse import csr_matrix
+from app.src.semantic_using_NLP import dense, store
+from app.src.semantic_using_NLP.batcher import MicroBatcher
+from app.utils import metrics
 
-EMBED_PATH = "embeddings.joblib"
+EMBED_DIR = "embeddings"
+DEFAULT_LANGUAGE = "english"
+# split every language partition further by page category
+PARTITION_BY_CATEGORY = False
+# LSA + IVF retrieval next to the FTS candidates (finds pages sharing no literal token)
+DENSE_RETRIEVAL = True
+# dense-only hits are discounted against lexical cosine scores
+DENSE_WEIGHT = 0.8
+# neighbours taken per query (independent of the result depth) and the LSA
+# cosine they need; below it a "hit" is just an unrelated page
+DENSE_TOP_K = 20
+DENSE_MIN_SCORE = 0.3
+# gather /search queries arriving within BATCH_WINDOW_MS (up to BATCH_MAX_SIZE)
+# and score them together; off by default
+BATCH_SCORING = False
+BATCH_WINDOW_MS = 3.0
+BATCH_MAX_SIZE = 32
 
-def build_embeddings(force_rebuild=False):
+# Indic / Urdu words keep their combining vowel signs; the danda (।, ॥) separates
+INDIC_TOKEN_PATTERN = r"(?u)[\w\u0600-\u06FF\u0900-\u0963\u0966-\u0DFF]+"
+
+# per-language TfidfVectorizer settings; unknown languages get the Indic tokenizer
+LANGUAGE_TOKENIZERS = {
+    "english": {"stop_words": "english"},
+    "hindi": {"token_pattern": INDIC_TOKEN_PATTERN,
+              "stop_words": ['का', 'की', 'के', 'है', 'हैं', 'में', 'यह', 'और', 'से', 'को', 'पर',
+                             'लिए', 'भी', 'एक', 'था', 'थे', 'कि', 'जो', 'तो', 'ने', 'ही']},
+    "marathi": {"token_pattern": INDIC_TOKEN_PATTERN,
+                "stop_words": ['आहे', 'आणि', 'या', 'व', 'हे', 'ही', 'की', 'आहेत', 'च्या', 'ला',
+                               'मध्ये', 'तो', 'ते', 'एक', 'नाही']},
+}
+DEFAULT_TOKENIZER = {"token_pattern": INDIC_TOKEN_PATTERN}
+
+# key -> (CURRENT stamp, store.MappedPartition); remapped when a rebuild publishes
+_partitions = {}
+_partitions_lock = threading.Lock()
+
+
+def partition_key(language, category=None):
+    """Partition name for a language (and category when PARTITION_BY_CATEGORY)."""
+    key = (language or DEFAULT_LANGUAGE).lower()
+    if PARTITION_BY_CATEGORY and category:
+        key = f"{key}__{category.lower()}"
+    return re.sub(r"[^a-z0-9_-]", "_", key)
+
+
+def _make_vectorizer(language):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    opts = LANGUAGE_TOKENIZERS.get((language or DEFAULT_LANGUAGE).lower(), DEFAULT_TOKENIZER)
+    return TfidfVectorizer(max_features=20000, **opts)
+
+
+def _make_analyzer(language):
+    # same preprocessing/tokenizing/stop words as the fitted vectorizer
+    return _make_vectorizer(language).build_analyzer()
+
+
+def list_partitions():
+    """Partition keys for the pages currently in the DB, with their language/category filters."""
+    conn = db_connect()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT language, category FROM pages")
+    parts = {}
+    for r in cur.fetchall():
+        lang = r["language"] or DEFAULT_LANGUAGE
+        cat = r["category"] if PARTITION_BY_CATEGORY else None
+        parts[partition_key(lang, cat)] = (lang, cat)
+    conn.close()
+    return parts
+
+
+def _partition_filter(language, category=None):
+    """WHERE clause + params selecting a partition's pages."""
+    sql = "COALESCE(language, ?) = ?"
+    params = [DEFAULT_LANGUAGE, language or DEFAULT_LANGUAGE]
+    if PARTITION_BY_CATEGORY and category:
+        sql += " AND category = ?"
+        params.append(category)
+    return sql, params
+
+
+def partition_fingerprint(language, category=None):
     """
-    Build TF-IDF vectorizer and matrix for all documents in DB.
-    Persist to EMBED_PATH. Returns (vectorizer, matrix, doc_ids).
+    Cheap identity of a partition's page set (count, max/sum of ids, newest
+    crawl time) plus the fit settings; equal fingerprints mean a refit would
+    produce the same partition.
     """
-    if os.path.exists(EMBED_PATH) and not force_rebuild:
-        try:
-            data = joblib.load(EMBED_PATH)
-            return data["vectorizer"], data["matrix"], data["doc_ids"]
-        except Exception:
-            pass
+    where, params = _partition_filter(language, category)
     conn = db_connect()
     cur = conn.cursor()
-    cur.execute("SELECT id, title, summary, content FROM pages ORDER BY id")
+    cur.execute("SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(id), 0), MAX(last_crawled) "
+                "FROM pages WHERE " + where, params)
+    count, max_id, sum_id, newest = cur.fetchone()
+    conn.close()
+    opts = LANGUAGE_TOKENIZERS.get((language or DEFAULT_LANGUAGE).lower(), DEFAULT_TOKENIZER)
+    settings = repr((sorted(opts.items()), DENSE_RETRIEVAL, dense.DENSE_DIM, store.FORMAT_VERSION))
+    digest = hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+    return f"{count}:{max_id}:{sum_id}:{newest}:{digest}"
+
+
+def build_partition(language, category=None, force_rebuild=False, skip_unchanged=True):
+    """
+    Build (or load) the TF-IDF matrix and dense index for one partition and
+    publish it as a new generation under EMBED_DIR/<key>/ (see store.py).
+    With force_rebuild, a partition whose fingerprint matches the published
+    one is still reused unless skip_unchanged is False.
+    Returns the store.MappedPartition, or None when the partition has no pages.
+    """
+    key = partition_key(language, category)
+    fingerprint = partition_fingerprint(language, category)
+    if not force_rebuild or skip_unchanged:
+        loaded = _load_partition(key)
+        if loaded and not force_rebuild:
+            return loaded
+        if loaded and loaded.meta.get("fingerprint") == fingerprint:
+            metrics.inc("partition_builds_skipped", partition=key)
+            return loaded
+    conn = db_connect()
+    cur = conn.cursor()
+    where, params = _partition_filter(language, category)
+    cur.execute("SELECT id, title, summary, content FROM pages WHERE " + where + " ORDER BY id", params)
     rows = cur.fetchall()
     texts = []
     doc_ids = []
@@ -30,42 +137,240 @@ def build_embeddings(force_rebuild=False):
         texts.append(" ".join([r["title"] or "", r["summary"] or "", r["content"] or ""]))
     conn.close()
     if not texts:
-        vectorizer = TfidfVectorizer(stop_words='english', max_features=20000)
-        matrix = csr_matrix((0, 0))   # empty matrix fallback
-        joblib.dump({"vectorizer": vectorizer, "matrix": matrix, "doc_ids": doc_ids}, EMBED_PATH)
-        return vectorizer, matrix, doc_ids
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=20000)
-    matrix = vectorizer.fit_transform(texts)
-    joblib.dump({"vectorizer": vectorizer, "matrix": matrix, "doc_ids": doc_ids}, EMBED_PATH)
-    return vectorizer, matrix, doc_ids
+        store.remove_partition(EMBED_DIR, key)
+        with _partitions_lock:
+            _partitions.pop(key, None)
+        return None
+    vectorizer = _make_vectorizer(language)
+    try:
+        with metrics.timer("tfidf_fit"):
+            matrix = vectorizer.fit_transform(texts)
+    except ValueError:
+        # every token was a stop word / too short; skip this partition
+        return None
+    ivf = None
+    if DENSE_RETRIEVAL:
+        with metrics.timer("dense_fit"):
+            projection, vectors = dense.fit_lsa(matrix)
+            if projection is not None:
+                ivf = dense.build_ivf(vectors)
+                ivf["projection"] = projection
+    store.write_partition(EMBED_DIR, key, language or DEFAULT_LANGUAGE, vectorizer, matrix, doc_ids, ivf,
+                          fingerprint=fingerprint)
+    metrics.inc("partition_builds", partition=key)
+    return _load_partition(key)
+
+
+def _load_partition(key):
+    stamp = store.current_stamp(EMBED_DIR, key)
+    if stamp is None:
+        with _partitions_lock:
+            _partitions.pop(key, None)
+        return None
+    with _partitions_lock:
+        cached = _partitions.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    generation = store.current_generation(EMBED_DIR, key)
+    if not generation:
+        return None
+    with metrics.timer("embeddings_load"):
+        try:
+            part = store.MappedPartition(EMBED_DIR, key, generation, _make_analyzer)
+        except (OSError, ValueError, KeyError):
+            return None
+    with _partitions_lock:
+        _partitions[key] = (stamp, part)
+    return part
+
+
+def build_embeddings(force_rebuild=False, languages=None, categories=None, skip_unchanged=True):
+    """
+    Build (or load) every partition, optionally only those for the given
+    languages / categories. Partitions are independent, so rebuilding one
+    language leaves the others on disk untouched, and a forced rebuild only
+    refits partitions whose pages changed (see partition_fingerprint).
+    Published partitions with no pages left in the DB are removed.
+    Returns {partition_key: store.MappedPartition}.
+    """
+    langs = {l.lower() for l in languages} if languages else None
+    cats = {c.lower() for c in categories} if categories else None
+    built = {}
+    with metrics.timer("build_embeddings"):
+        partitions = list_partitions()
+        for key, (lang, cat) in partitions.items():
+            if langs and lang.lower() not in langs:
+                continue
+            if cats and cat and cat.lower() not in cats:
+                continue
+            part = build_partition(lang, cat, force_rebuild=force_rebuild, skip_unchanged=skip_unchanged)
+            if part:
+                built[key] = part
+        # e.g. expiry deleted a partition's last page: its dense hits would
+        # otherwise keep returning deleted ids
+        for key in set(store.list_keys(EMBED_DIR)) - set(partitions):
+            store.remove_partition(EMBED_DIR, key)
+            with _partitions_lock:
+                _partitions.pop(key, None)
+            metrics.inc("partitions_removed")
+            print(f"[embeddings] removed partition {key}: no pages left")
+    return built
+
+
+def index_generation():
+    """Live generation of every published partition, as one comparable string."""
+    return ",".join(f"{key}={store.current_generation(EMBED_DIR, key)}" for key in store.list_keys(EMBED_DIR))
+
+
+def _partitions_for(lang=None, category=None):
+    """(key, entry) for the loaded partitions a query with these filters can touch."""
+    if lang and (category or not PARTITION_BY_CATEGORY):
+        keys = [partition_key(lang, category)]
+    else:
+        keys = store.list_keys(EMBED_DIR)
+        if lang:
+            keys = [k for k in keys if k.split("__")[0] == partition_key(lang)]
+        elif category and PARTITION_BY_CATEGORY:
+            suffix = "__" + partition_key(category)
+            keys = [k for k in keys if k.endswith(suffix)]
+    entries = []
+    for key in keys:
+        part = _load_partition(key)
+        if part is not None:
+            entries.append((key, part))
+    return entries
+
+
+def _score_many(requests, use_dense, nprobe=dense.DEFAULT_NPROBE, dense_k=None):
+    """
+    Score a batch of (query, candidate_doc_ids, top_k, lang, category) requests.
+    Dense retrieval takes dense_k neighbours per request (default: its top_k).
+    Requests touching the same partition are vectorized with one transform()
+    and scored with one sparse product against the union of their candidate
+    rows (TF-IDF rows are L2-normalized, so the dot product is the cosine).
+    Returns (lexical, dense_hits): one {doc_id: score} dict per request each.
+    """
+    lexical = [{} for _ in requests]
+    dense_hits = [{} for _ in requests]
+    groups = {}
+    for i, (_, _, _, lang, category) in enumerate(requests):
+        for key, part in _partitions_for(lang, category):
+            groups.setdefault(key, (part, []))[1].append(i)
+    metrics.inc("score_batches")
+    metrics.inc("score_requests", len(requests))
+    with metrics.timer("score"):
+        _score_groups(requests, groups, lexical, dense_hits, use_dense, nprobe, dense_k)
+    return lexical, dense_hits
+
+
+def _score_groups(requests, groups, lexical, dense_hits, use_dense, nprobe, dense_k=None):
+    for part, idxs in groups.values():
+        ivf = part.dense if use_dense else None
+        # Identify row indices (and ids) for each request's candidates in this partition
+        found = [part.rows_for(requests[i][1]) for i in idxs]
+        if ivf is None:
+            # lexical only: requests without candidates here need no vectorizing
+            keep = [n for n, (r, _) in enumerate(found) if r]
+            idxs = [idxs[n] for n in keep]
+            found = [found[n] for n in keep]
+            if not idxs:
+                continue
+        qm = part.transform([requests[i][0] for i in idxs])
+        if any(r for r, _ in found):
+            union = np.unique(np.concatenate([np.asarray(r, dtype=np.int64) for r, _ in found if r]))
+            sims = (qm @ part.matrix[union].T).toarray()
+            for n, i in enumerate(idxs):
+                rows, ids = found[n]
+                if not rows:
+                    continue
+                cols = np.searchsorted(union, rows)
+                for doc_id, score in zip(ids, sims[n, cols]):
+                    lexical[i][doc_id] = float(score)
+        if ivf is not None:
+            qd = dense.project_queries(ivf["projection"], qm)
+            for n, i in enumerate(idxs):
+                if not qd[n].any():
+                    continue
+                rows, scores = dense.search_ivf(ivf, qd[n], top_k=dense_k or requests[i][2], nprobe=nprobe)
+                for row_index, score in zip(rows, scores):
+                    dense_hits[i][int(part.doc_ids[row_index])] = float(score)
+
 
-def semantic_rank(query: str, candidate_doc_ids: list, top_k=10):
+def semantic_rank(query: str, candidate_doc_ids: list, top_k=10, lang=None, category=None):
     """
     Re-rank candidate_doc_ids (list of page ids) given a query string.
+    Only the partitions matching the lang/category filters are consulted;
+    each candidate is scored with its own partition's vectorizer.
     Returns list of tuples (doc_id, score) sorted by descending score.
     """
     if not candidate_doc_ids:
         return []
-    vectorizer, matrix, doc_ids = build_embeddings()
-    # Build a mapping from doc_id -> row index in matrix
-    id_to_idx = {doc_id: idx for idx, doc_id in enumerate(doc_ids)}
-    # Identify indices for candidates (skip if not in id_to_idx)
-    cand_indices = [id_to_idx[d] for d in candidate_doc_ids if d in id_to_idx]
-    if not cand_indices:
-        # fallback: return empty score list
-        return []
-    # transform query
-    qv = vectorizer.transform([query])
-    # compute similarities (we only compare against candidate rows)
-    cand_matrix = matrix[cand_indices]
-    sims = cosine_similarity(qv, cand_matrix)[0]  # shape (len(cand_indices),)
-    scored = list(zip([candidate_doc_ids[i] for i in range(len(candidate_doc_ids)) if candidate_doc_ids[i] in id_to_idx], sims))
-    # Note: need to map properly; above line matches ordering of cand_indices to doc ids
-    # But safer rebuild correct mapping:
-    scored = []
-    for idx, row_index in enumerate(cand_indices):
-        doc_id = doc_ids[row_index]
-        score = sims[idx]
-        scored.append((doc_id, float(score)))
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:top_k]
+    lexical, _ = _score_many([(query, candidate_doc_ids, top_k, lang, category)], use_dense=False)
+    return sorted(lexical[0].items(), key=lambda x: x[1], reverse=True)[:top_k]
+
+
+def dense_candidates(query: str, top_k=50, lang=None, category=None, nprobe=dense.DEFAULT_NPROBE):
+    """
+    Approximate nearest neighbours of the query in LSA space, across the
+    partitions matching the filters. Returns [(doc_id, score)] best first.
+    """
+    _, dense_hits = _score_many([(query, [], top_k, lang, category)], use_dense=True, nprobe=nprobe)
+    return sorted(dense_hits[0].items(), key=lambda x: x[1], reverse=True)[:top_k]
+
+
+def hybrid_rank_many(requests):
+    """
+    Lexical re-rank of each request's FTS candidates merged with dense
+    retrieval hits, for a batch of (query, candidate_doc_ids, top_k, lang,
+    category) requests. Dense retrieval adds at most DENSE_TOP_K pages scoring
+    DENSE_MIN_SCORE or more, scaled by DENSE_WEIGHT; a page found by both keeps
+    its best score. Candidates not in any published partition yet (crawled
+    since the last rebuild, or in a partition that failed to fit) follow
+    with score 0.0 in their given order. Returns one [(doc_id, score)] list
+    per request.
+    """
+    lexical, dense_hits = _score_many(requests, use_dense=DENSE_RETRIEVAL, dense_k=DENSE_TOP_K)
+    ranked = []
+    for req, scores, hits in zip(requests, lexical, dense_hits):
+        for doc_id, score in hits.items():
+            if score > 0 and score >= DENSE_MIN_SCORE:
+                scores[doc_id] = max(scores.get(doc_id, 0.0), score * DENSE_WEIGHT)
+        unscored = [doc_id for doc_id in req[1] if doc_id not in scores]
+        if unscored:
+            metrics.inc("rank_unscored_candidates", len(unscored))
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        ranked.append((best + [(doc_id, 0.0) for doc_id in unscored])[:req[2]])
+    return ranked
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _rank_batch(requests):
+    # runs on the batcher thread, outside the callers' request contexts: the
+    # batch's stage timings (score, embeddings_load, ...) go back to every caller
+    stages = metrics.start_request()
+    return [(ranked, stages) for ranked in hybrid_rank_many(requests)]
+
+
+def _get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(_rank_batch, window_ms=BATCH_WINDOW_MS,
+                                    max_batch=BATCH_MAX_SIZE, name="semantic-batcher")
+        return _batcher
+
+
+def hybrid_rank(query: str, candidate_doc_ids: list, top_k=10, lang=None, category=None):
+    """
+    hybrid_rank_many() for a single query. With BATCH_SCORING on, the call is
+    handed to the micro-batcher and scored together with concurrent requests.
+    """
+    request = (query, list(candidate_doc_ids), top_k, lang, category)
+    if BATCH_SCORING:
+        ranked, stages = _get_batcher().submit(request)
+        metrics.add_stages(stages)
+        return ranked
+    return hybrid_rank_many([request])[0]
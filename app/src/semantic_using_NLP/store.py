@@ -0,0 +1,192 @@
+# store.py
+# Versioned, memory-mappable on-disk format for one semantic partition:
+#
+#   <root>/<key>/CURRENT         name of the live generation (replaced atomically)
+#   <root>/<key>/g<N>/meta.json  format version, language, shapes
+#   <root>/<key>/g<N>/*.npy      CSR data/indices/indptr, idf, vocab blob +
+#                                offsets, doc ids, optional dense/IVF arrays
+#
+# Every array is opened with mmap_mode="r", so all uvicorn workers share a
+# single copy through the page cache and loading costs a few syscalls.
+import json
+import os
+import shutil
+import time
+from collections import Counter
+import numpy as np
+
+FORMAT_VERSION = 1
+KEEP_GENERATIONS = 2  # live + previous (readers may still have it mapped)
+DENSE_ARRAYS = ("projection", "centroids", "offsets", "order", "vectors")
+
+
+def current_generation(root, key):
+    """Name of the live generation for a partition, or None."""
+    try:
+        with open(os.path.join(root, key, "CURRENT")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def current_stamp(root, key):
+    """Cheap change detector for CURRENT (mtime_ns), or None if absent."""
+    try:
+        return os.stat(os.path.join(root, key, "CURRENT")).st_mtime_ns
+    except OSError:
+        return None
+
+
+def list_keys(root):
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    return sorted(n for n in names if os.path.exists(os.path.join(root, n, "CURRENT")))
+
+
+def _save(dirpath, name, array):
+    np.save(os.path.join(dirpath, f"{name}.npy"), np.ascontiguousarray(array))
+
+
+def write_partition(root, key, language, vectorizer, matrix, doc_ids, dense_index=None, fingerprint=None):
+    """
+    Write a fitted partition as a new generation and publish it by atomically
+    replacing CURRENT. Older generations beyond KEEP_GENERATIONS are removed.
+    Returns the generation name.
+    """
+    part_dir = os.path.join(root, key)
+    os.makedirs(part_dir, exist_ok=True)
+    gen = f"g{time.time_ns()}"
+    tmp_dir = os.path.join(part_dir, gen + ".tmp")
+    os.makedirs(tmp_dir)
+
+    matrix = matrix.tocsr().astype(np.float32)
+    matrix.sum_duplicates()
+    matrix.sort_indices()
+    _save(tmp_dir, "data", matrix.data)
+    _save(tmp_dir, "indices", matrix.indices.astype(np.int32))
+    _save(tmp_dir, "indptr", matrix.indptr.astype(np.int32 if matrix.nnz < 2**31 else np.int64))
+    _save(tmp_dir, "idf", vectorizer.idf_.astype(np.float64))
+    _save(tmp_dir, "doc_ids", np.asarray(doc_ids, dtype=np.int64))
+    # vocabulary: column order is the sorted term order, so a UTF-8 blob plus
+    # offsets can be binary searched without building a dict per worker
+    terms = [t.encode("utf-8") for t in vectorizer.get_feature_names_out()]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in terms], out=offsets[1:])
+    _save(tmp_dir, "vocab_blob", np.frombuffer(b"".join(terms), dtype=np.uint8))
+    _save(tmp_dir, "vocab_offsets", offsets)
+    if dense_index is not None:
+        for name in DENSE_ARRAYS:
+            _save(tmp_dir, name, dense_index[name])
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "language": language,
+        "shape": list(matrix.shape),
+        "nnz": int(matrix.nnz),
+        "dense": dense_index is not None,
+        "fingerprint": fingerprint,
+        "created": time.time(),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    os.replace(tmp_dir, os.path.join(part_dir, gen))
+    pointer_tmp = os.path.join(part_dir, f"CURRENT.{os.getpid()}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(gen)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(part_dir, "CURRENT"))
+    _prune(part_dir, gen)
+    return gen
+
+
+def _prune(part_dir, live):
+    gens = sorted(n for n in os.listdir(part_dir) if n.startswith("g") and not n.endswith(".tmp"))
+    keep = set(gens[-KEEP_GENERATIONS:]) | {live}
+    for name in gens:
+        if name not in keep:
+            shutil.rmtree(os.path.join(part_dir, name), ignore_errors=True)
+
+
+def remove_partition(root, key):
+    shutil.rmtree(os.path.join(root, key), ignore_errors=True)
+
+
+class MappedPartition:
+    """
+    Read-only view of one partition generation. Arrays are np.memmap-backed;
+    transform() vectorizes queries exactly like the fitted TfidfVectorizer
+    (raw counts * idf, L2-normalized) using the stored vocabulary and idf.
+    """
+
+    def __init__(self, root, key, generation, make_analyzer):
+        from scipy.sparse import csr_matrix
+        self.key = key
+        self.generation = generation
+        path = os.path.join(root, key, generation)
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported embeddings format {self.meta.get('format_version')}")
+        # plain ndarray views over the maps (np.memmap indexing is slow per call)
+        load = lambda name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        shape = tuple(self.meta["shape"])
+        self.matrix = csr_matrix((load("data"), load("indices"), load("indptr")), shape=shape, copy=False)
+        self.matrix.has_sorted_indices = True
+        self.idf = load("idf")
+        self.doc_ids = load("doc_ids")
+        self._vocab_blob = load("vocab_blob")
+        self._vocab_offsets = load("vocab_offsets")
+        self.dense = {name: load(name) for name in DENSE_ARRAYS} if self.meta.get("dense") else None
+        self.language = self.meta["language"]
+        self._analyzer = make_analyzer(self.language)
+
+    @property
+    def n_terms(self):
+        return self.matrix.shape[1]
+
+    def term_index(self, term):
+        """Column of a term via binary search over the sorted UTF-8 vocab, or -1."""
+        target = term.encode("utf-8")
+        blob, offsets = self._vocab_blob, self._vocab_offsets
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = blob[offsets[mid]:offsets[mid + 1]].tobytes()
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def transform(self, texts):
+        from scipy.sparse import csr_matrix
+        rows, cols, counts = [], [], []
+        for i, text in enumerate(texts):
+            for term, count in Counter(self._analyzer(text)).items():
+                j = self.term_index(term)
+                if j >= 0:
+                    rows.append(i)
+                    cols.append(j)
+                    counts.append(count)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(counts, dtype=np.float64) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=len(texts)))
+        norms[norms == 0] = 1.0
+        vals /= norms[rows]
+        return csr_matrix((vals, (rows, cols)), shape=(len(texts), self.n_terms))
+
+    def rows_for(self, doc_ids):
+        """(rows, ids) of the given page ids present in this partition (doc_ids are sorted)."""
+        if not len(doc_ids) or not len(self.doc_ids):
+            return [], []
+        ids = np.asarray(doc_ids, dtype=np.int64)
+        pos = np.searchsorted(self.doc_ids, ids)
+        pos[pos >= len(self.doc_ids)] = 0
+        hit = np.asarray(self.doc_ids[pos]) == ids
+        return pos[hit].tolist(), ids[hit].tolist()
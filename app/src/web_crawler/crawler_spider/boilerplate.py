@@ -0,0 +1,124 @@
+# boilerplate.py
+# ================================================================
+#  KnowledgeBridge - Per-host Template Boilerplate Removal
+#  Portals repeat the same disclaimers, banners, menus and "last
+#  updated" lines (as <p>) on every page. Each text block of a page is
+#  fingerprinted; blocks whose fingerprint appeared on enough earlier
+#  pages of the same host are dropped before the page is stored.
+#  Each url is learned from once per host: seed pages fetched on every
+#  crawl and recrawls would otherwise turn a page's own text into
+#  "boilerplate". Counts persist in host_blocks / host_pages / host_urls,
+#  so later crawls start with what earlier ones learned.
+# ================================================================
+import hashlib
+import re
+from app.src.web_crawler.indexer.indexer import db_connect
+from app.utils import metrics
+
+# a block is boilerplate once seen on MIN_PAGES pages of the host and on at
+# least MIN_SHARE of the host's pages seen so far
+MIN_PAGES = 3
+MIN_SHARE = 0.3
+# per-host fingerprint table cap; the stalest one-off blocks are dropped first
+MAX_HOST_BLOCKS = 5000
+
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def fingerprint(block: str) -> int:
+    """64-bit id of a block; case, spacing and numbers (dates, counters) are ignored."""
+    norm = _DIGITS_RE.sub("0", " ".join(block.lower().split()))
+    return _hash64(norm)
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class _HostStats:
+    __slots__ = ("pages", "blocks", "urls")
+
+    def __init__(self, pages=0, blocks=None, urls=None):
+        self.pages = pages           # distinct urls learned from
+        self.blocks = blocks or {}   # fingerprint -> [pages seen on, last seen (host page no.)]
+        self.urls = urls or set()    # url fingerprints already learned from
+
+
+class BoilerplateFilter:
+    def __init__(self, min_pages=MIN_PAGES, min_share=MIN_SHARE):
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self._hosts = {}
+
+    def _stats(self, host):
+        stats = self._hosts.get(host)
+        if stats is None:
+            conn = db_connect()
+            cur = conn.cursor()
+            cur.execute("SELECT pages FROM host_pages WHERE host = ?", (host,))
+            row = cur.fetchone()
+            cur.execute("SELECT fingerprint, pages, last_seen FROM host_blocks WHERE host = ?", (host,))
+            blocks = {r["fingerprint"]: [r["pages"], r["last_seen"]] for r in cur.fetchall()}
+            cur.execute("SELECT url_fp FROM host_urls WHERE host = ?", (host,))
+            urls = {r["url_fp"] for r in cur.fetchall()}
+            conn.close()
+            stats = self._hosts[host] = _HostStats(row["pages"] if row else 0, blocks, urls)
+        return stats
+
+    def is_boilerplate(self, stats, fp):
+        seen = stats.blocks.get(fp)
+        return bool(seen) and seen[0] >= self.min_pages and seen[0] >= self.min_share * stats.pages
+
+    def clean(self, host, blocks, url=None):
+        """
+        blocks with this host's known boilerplate removed (all of them if
+        nothing else would be left), then learn from this page's blocks
+        unless url was already learned from.
+        """
+        if not host or not blocks:
+            return blocks
+        stats = self._stats(host)
+        fps = [fingerprint(b) for b in blocks]
+        kept = [b for b, fp in zip(blocks, fps) if not self.is_boilerplate(stats, fp)]
+        if not kept:
+            # a page made only of template text: keep it rather than store nothing
+            kept = blocks
+        removed = len(blocks) - len(kept)
+        if removed:
+            metrics.inc("boilerplate_blocks_removed", removed)
+            metrics.inc("boilerplate_chars_removed", sum(len(b) for b in blocks) - sum(len(b) for b in kept))
+        url_fp = _hash64(url) if url else None
+        if url_fp is None or url_fp not in stats.urls:
+            self._learn(host, stats, set(fps), url_fp)
+        return kept
+
+    def _learn(self, host, stats, fps, url_fp=None):
+        stats.pages += 1
+        if url_fp is not None:
+            stats.urls.add(url_fp)
+        rows = []
+        for fp in fps:
+            seen = stats.blocks.setdefault(fp, [0, 0])
+            seen[0] += 1
+            seen[1] = stats.pages
+            rows.append((host, fp, seen[0], seen[1]))
+        dropped = []
+        if len(stats.blocks) > MAX_HOST_BLOCKS:
+            # forget the stalest blocks seen only once
+            singles = sorted((v[1], fp) for fp, v in stats.blocks.items() if v[0] == 1)
+            for _, fp in singles[:len(stats.blocks) - MAX_HOST_BLOCKS]:
+                del stats.blocks[fp]
+                dropped.append((host, fp))
+        conn = db_connect()
+        cur = conn.cursor()
+        cur.execute("""INSERT INTO host_pages (host, pages) VALUES (?, ?)
+                       ON CONFLICT(host) DO UPDATE SET pages = excluded.pages""", (host, stats.pages))
+        cur.executemany("""INSERT INTO host_blocks (host, fingerprint, pages, last_seen) VALUES (?, ?, ?, ?)
+                           ON CONFLICT(host, fingerprint) DO UPDATE SET pages = excluded.pages,
+                           last_seen = excluded.last_seen""", rows)
+        if url_fp is not None:
+            cur.execute("INSERT OR IGNORE INTO host_urls (host, url_fp) VALUES (?, ?)", (host, url_fp))
+        if dropped:
+            cur.executemany("DELETE FROM host_blocks WHERE host = ? AND fingerprint = ?", dropped)
+        conn.commit()
+        conn.close()
@@ -0,0 +1,202 @@
+# classifier.py
+# ================================================================
+#  KnowledgeBridge - Category & Language Tagging
+#  Category keywords are counted by one regex alternation (longest first,
+#  non-overlapping), language function words as whole whitespace tokens
+#  (Counter) and characters per Unicode script with one numpy bincount;
+#  no per-character Python loop.
+# ================================================================
+import re
+from collections import Counter
+import numpy as np
+
+# category keyword table (lowercase; matched as substrings like the old any(k in text),
+# the longest keyword at a position winning: 'farmer' is one hit, not farm + farmer)
+CATEGORY_KEYWORDS = {
+    "health": ['health', 'hospital', 'mohfw', 'vaccine', 'covid', 'corona', 'coronavirus',
+               'स्वास्थ्य', 'आरोग्य', 'अस्पताल', 'টিকা', 'சுகாதார'],
+    "agriculture": ['agri', 'farm', 'krishi', 'कृषि', 'pmkisan', 'farmer', 'किसान', 'शेतकरी',
+                    'शेती', 'விவசாய', 'কৃষি'],
+    "education": ['education', 'school', 'ugc', 'ncert', 'student', 'college', 'शिक्षा',
+                  'विद्यार्थी', 'शाळा', 'கல்வி', 'শিক্ষা'],
+}
+DEFAULT_CATEGORY = "government"
+
+# function words telling apart languages that share a script; matched only as
+# whole tokens (a bare 'छ' or 'करा' is also a piece of स्वच्छ or कराएं)
+LANGUAGE_KEYWORDS = {
+    "hindi": ['की', 'के', 'है', 'में', 'यह', 'और', 'नए', 'किसान', 'हैं', 'लिए', 'करें'],
+    "marathi": ['आहे', 'आणि', 'च्या', 'नाही', 'करा', 'आहेत', 'शेतकरी', 'महाराष्ट्र'],
+    "nepali": ['छ', 'हुन्छ', 'गर्न', 'नेपाल'],
+    "tamil": ['மற்றும்', 'ஒரு', 'இந்த'],
+    "bengali": ['এবং', 'করে', 'জন্য'],
+    "telugu": ['మరియు', 'ఈ'],
+    "kannada": ['ಮತ್ತು', 'ಈ'],
+    "malayalam": ['ഒരു', 'ഈ'],
+    "gujarati": ['અને', 'છે'],
+    "punjabi": ['ਅਤੇ', 'ਹੈ'],
+    "odia": ['ଏବଂ', 'ପାଇଁ'],
+    "urdu": ['اور', 'ہے'],
+}
+DEFAULT_LANGUAGE = "english"
+
+# (first, last, script) codepoint ranges; languages below vote by script
+SCRIPT_RANGES = [
+    (0x0041, 0x007A, "latin"),
+    (0x0600, 0x06FF, "arabic"),
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0A00, 0x0A7F, "gurmukhi"),
+    (0x0A80, 0x0AFF, "gujarati"),
+    (0x0B00, 0x0B7F, "oriya"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+]
+SCRIPT_LANGUAGES = {
+    "latin": ["english"],
+    "arabic": ["urdu"],
+    "devanagari": ["hindi", "marathi", "nepali"],
+    "bengali": ["bengali"],
+    "gurmukhi": ["punjabi"],
+    "gujarati": ["gujarati"],
+    "oriya": ["odia"],
+    "tamil": ["tamil"],
+    "telugu": ["telugu"],
+    "kannada": ["kannada"],
+    "malayalam": ["malayalam"],
+}
+
+# only the head of very long pages is needed to tag them
+MAX_CLASSIFY_CHARS = 20000
+# function words only split a script's share between its languages; the
+# first few thousand characters settle that
+LANGUAGE_SAMPLE_CHARS = 5000
+# stripped from both ends of a token before looking it up as a function word
+TOKEN_PUNCTUATION = ".,;:!?\"'()[]{}<>|/\\-–—…।॥"
+
+
+SCRIPT_NAMES = [None] + sorted({script for _, _, script in SCRIPT_RANGES})
+
+
+def _build_script_table():
+    # codepoint 0..0x0D7F -> index into SCRIPT_NAMES (0 for punctuation/digits/etc.)
+    table = np.zeros(SCRIPT_RANGES[-1][1] + 1, dtype=np.uint8)
+    for first, last, script in SCRIPT_RANGES:
+        table[first:last + 1] = SCRIPT_NAMES.index(script)
+    table[0x5B:0x61] = 0  # [\]^_` sit between A-Z and a-z
+    return table
+
+
+class TextClassifier:
+    """
+    Scores category and language labels for a page. Keyword hits and
+    per-script character counts are gathered by C-level scans (one regex
+    findall, Counter over tokens, a numpy bincount); classify() returns
+    {"category": [(label, score), ...], "language": [...]} sorted by
+    descending score.
+    """
+
+    def __init__(self, category_keywords=None, language_keywords=None, max_chars=MAX_CLASSIFY_CHARS):
+        self.category_keywords = category_keywords or CATEGORY_KEYWORDS
+        self.language_keywords = language_keywords or LANGUAGE_KEYWORDS
+        self.max_chars = max_chars
+        self._category_of = {}
+        for cat, words in self.category_keywords.items():
+            for w in words:
+                self._category_of.setdefault(w.lower(), []).append(cat)
+        # longest first: alternation takes the first branch that matches
+        self._category_re = re.compile("|".join(
+            re.escape(w) for w in sorted(self._category_of, key=len, reverse=True)))
+        self._language_of = {}
+        for lang, words in self.language_keywords.items():
+            for w in words:
+                self._language_of.setdefault(w.lower(), []).append(lang)
+        self._scripts = _build_script_table()
+        # scripts where function words have to pick between languages
+        self._shared_scripts = [s for s, langs in SCRIPT_LANGUAGES.items() if len(langs) > 1]
+
+    def _scan(self, text: str):
+        """Keyword hits {(kind, label): count} and letter counts per script."""
+        hits = {}
+        for word, n in Counter(self._category_re.findall(text)).items():
+            for cat in self._category_of[word]:
+                hits[("category", cat)] = hits.get(("category", cat), 0) + n
+        # UTF-16 code units; everything past the table (and surrogates) has no script
+        units = np.frombuffer(text.encode("utf-16-le"), dtype=np.uint16)
+        counts = np.bincount(self._scripts[units[units < len(self._scripts)]], minlength=len(SCRIPT_NAMES))
+        script_counts = {SCRIPT_NAMES[i]: int(c) for i, c in enumerate(counts) if i and c}
+        if any(script_counts.get(s) for s in self._shared_scripts):
+            for token, n in Counter(text[:LANGUAGE_SAMPLE_CHARS].split()).items():
+                for lang in self._language_of.get(token.strip(TOKEN_PUNCTUATION), ()):
+                    hits[("language", lang)] = hits.get(("language", lang), 0) + n
+        return hits, script_counts
+
+    def classify(self, text: str, url: str = ""):
+        body = (text or "")
+        if self.max_chars:
+            body = body[:self.max_chars]
+        # url first, separated so a keyword can't straddle url and text
+        url = (url or "").lower()
+        hits, script_counts = self._scan(url + "\n" + body.lower())
+        # url letters feed the category keywords but should not vote on language
+        url_letters = sum(1 for ch in url if "a" <= ch <= "z")
+        if url_letters and script_counts.get("latin"):
+            script_counts["latin"] = max(0, script_counts["latin"] - url_letters)
+
+        categories = {}
+        languages = {}
+        for (kind, label), count in hits.items():
+            if kind == "category":
+                categories[label] = categories.get(label, 0) + count
+            else:
+                languages[label] = count
+
+        # language score: share of letters in the language's script, with keyword
+        # hits splitting the share between languages written in the same script
+        lang_scores = {}
+        total_letters = sum(script_counts.values())
+        for script, count in script_counts.items():
+            langs = SCRIPT_LANGUAGES.get(script, [])
+            if not langs or not count:
+                continue
+            share = count / total_letters
+            kw_total = sum(languages.get(l, 0) for l in langs)
+            for l in langs:
+                if kw_total:
+                    part = share * languages.get(l, 0) / kw_total
+                else:
+                    # no function words seen: the first language of the script wins
+                    part = share if l == langs[0] else 0.0
+                if part:
+                    lang_scores[l] = lang_scores.get(l, 0.0) + part
+
+        return {
+            "category": sorted(categories.items(), key=lambda x: x[1], reverse=True),
+            "language": sorted(lang_scores.items(), key=lambda x: x[1], reverse=True),
+        }
+
+    def guess_category(self, url: str, text: str):
+        scored = self.classify(text, url)["category"]
+        return scored[0][0] if scored else DEFAULT_CATEGORY
+
+    def detect_language(self, text: str):
+        return self.tag(text)[1]
+
+    def tag(self, text: str, url: str = ""):
+        """(category, language) for a page from one classify() call."""
+        result = self.classify(text, url)
+        category = result["category"][0][0] if result["category"] else DEFAULT_CATEGORY
+        language = result["language"][0][0] if result["language"] else DEFAULT_LANGUAGE
+        return category, language
+
+
+_default_classifier = None
+
+
+def get_classifier() -> TextClassifier:
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = TextClassifier()
+    return _default_classifier
@@ -1,5 +1,7 @@
 # crawler.py
+import codecs
 import random
+import re
 import time
 import socket
 import hashlib
@@ -10,16 +12,51 @@ from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from app.src.web_crawler.crawler_spider.seeds import PRIMARY_SEEDS , TRUSTED_SUFFIXES
+from app.src.web_crawler.crawler_spider.classifier import get_classifier
+from app.src.web_crawler.crawler_spider.boilerplate import BoilerplateFilter
 from app.src.web_crawler.indexer.indexer import db_connect
+from app.utils import metrics
 
 DEFAULT_TIMEOUT = 12
 CRAWL_POLITENESS = 1.0
 MIN_CONTENT_LENGTH = 120  # minimum chars to consider storing
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # body bytes read per page; the rest is dropped
+FETCH_CHUNK_BYTES = 16 * 1024
+CHARSET_SNIFF_BYTES = 4096  # where a <meta charset> has to appear
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.I)
+_BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+def _detect_charset(content_type: str, head: bytes) -> str:
+    """Charset from a BOM, the Content-Type header, or a <meta> in the first bytes; utf-8 otherwise."""
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return "utf-8-sig" if name == "utf-8" else name
+    candidates = []
+    m = re.search(r"charset=([^\s;]+)", content_type)
+    if m:
+        candidates.append(m.group(1).strip("\"'"))
+    m = _META_CHARSET_RE.search(head)
+    if m:
+        candidates.append(m.group(1).decode("ascii", "ignore"))
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
 
 class EnhancedCrawler:
-    def __init__(self, politeness=CRAWL_POLITENESS, max_pages=200):
+    def __init__(self, politeness=CRAWL_POLITENESS, max_pages=200, seeds=None, trusted_suffixes=None):
         self.politeness = politeness
         self.max_pages = max_pages
+        # category -> start urls, and the host suffixes links are followed to
+        # (seeds.py by default; benchmarks point these at a local replay server)
+        self.seeds = PRIMARY_SEEDS if seeds is None else seeds
+        self.trusted_suffixes = tuple(TRUSTED_SUFFIXES if trusted_suffixes is None else trusted_suffixes)
+        self.classifier = get_classifier()
+        self.boilerplate = BoilerplateFilter()
         self.session = requests.Session()
         retries = Retry(total=3, backoff_factor=1,
                         status_forcelist=(500,502,503,504),
@@ -47,7 +84,7 @@ class EnhancedCrawler:
     def _compute_hash(self, text: str) -> str:
         return hashlib.md5((text or "").encode("utf-8")).hexdigest()
 
-    def _clean_text(self, html: str):
+    def _clean_text(self, html: str, url: Optional[str] = None):
         if not html:
             return "", "", ""
         soup = BeautifulSoup(html, "html.parser")
@@ -64,42 +101,77 @@ class EnhancedCrawler:
         # meta description
         meta = soup.find("meta", attrs={"name":"description"}) or soup.find("meta", attrs={"property":"og:description"})
         summary = meta.get("content").strip() if meta and meta.get("content") else ""
-        paragraphs = [p.get_text(separator=" ", strip=True) for p in main.find_all("p") if p.get_text(strip=True)]
-        content = " ".join(paragraphs)
-        if not content:
-            content = main.get_text(separator=" ", strip=True)
-        content = " ".join(content.split())
+        blocks = [p.get_text(separator=" ", strip=True) for p in main.find_all("p") if p.get_text(strip=True)]
+        if not blocks:
+            blocks = [line.strip() for line in main.get_text(separator="\n").splitlines() if line.strip()]
+        # drop this host's template blocks (disclaimers, banners, menus)
+        if url:
+            blocks = self.boilerplate.clean(urlparse(url).hostname, blocks, url)
+        content = " ".join(" ".join(blocks).split())
         if not summary:
             summary = content[:500]
         return title.strip(), summary.strip(), content.strip()
 
     def _detect_language(self, text: str):
-        hindi_keywords = ['की','के','है','में','यह','और','नए','किसान']
-        if any(k in text for k in hindi_keywords):
-            return "hindi"
-        return "english"
+        return self.classifier.detect_language(text)
 
     def _guess_category(self, url: str, text: str):
-        urll = url.lower() + (text or "").lower()
-        health_k = ['health','hospital','mohfw','vaccine','covid','corona','coronavirus']
-        agri_k = ['agri','farm','krishi','कृषि','pmkisan','farmer']
-        edu_k = ['education','school','ugc','ncert','student','college']
-        if any(k in urll for k in health_k):
-            return "health"
-        if any(k in urll for k in agri_k):
-            return "agriculture"
-        if any(k in urll for k in edu_k):
-            return "education"
-        return "government"
+        return self.classifier.guess_category(url, text)
+
+    def _read_html(self, resp) -> Optional[str]:
+        """
+        Decode an HTML response streamed with stream=True. Rejected on headers
+        alone (not HTML, declared size over MAX_PAGE_BYTES) before the body is
+        read; otherwise read in chunks, decoded incrementally, and cut off at
+        MAX_PAGE_BYTES. The response is always closed.
+        """
+        with resp:
+            resp.raise_for_status()
+            ctype = resp.headers.get("content-type", "").lower()
+            try:
+                declared = int(resp.headers.get("content-length", ""))
+            except ValueError:
+                declared = None
+            if not any(t in ctype for t in HTML_CONTENT_TYPES):
+                metrics.inc("crawl_rejected", reason="content_type")
+                metrics.inc("crawl_bytes_saved", declared or 0)
+                return None
+            if declared is not None and declared > MAX_PAGE_BYTES:
+                metrics.inc("crawl_rejected", reason="too_large")
+                metrics.inc("crawl_bytes_saved", declared)
+                return None
+            decoder = None
+            head = b""
+            parts = []
+            read = 0
+            for chunk in resp.iter_content(FETCH_CHUNK_BYTES):
+                chunk = chunk[:MAX_PAGE_BYTES - read]
+                read += len(chunk)
+                if decoder is None:
+                    # pick the charset from the header, or sniff the first bytes
+                    head += chunk
+                    if len(head) < CHARSET_SNIFF_BYTES and read < MAX_PAGE_BYTES:
+                        continue
+                    decoder = codecs.getincrementaldecoder(_detect_charset(ctype, head))(errors="replace")
+                    chunk, head = head, b""
+                parts.append(decoder.decode(chunk))
+                if read >= MAX_PAGE_BYTES:
+                    metrics.inc("crawl_truncated")
+                    if declared:
+                        metrics.inc("crawl_bytes_saved", max(0, declared - read))
+                    break
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(_detect_charset(ctype, head))(errors="replace")
+                parts.append(decoder.decode(head))
+            parts.append(decoder.decode(b"", final=True))
+            metrics.inc("crawl_bytes_read", read)
+            return "".join(parts)
 
     def _fetch(self, url: str) -> Optional[str]:
         headers = self._get_headers()
         try:
-            resp = self.session.get(url, timeout=DEFAULT_TIMEOUT, headers=headers)
-            resp.raise_for_status()
-            if "text/html" not in resp.headers.get("content-type", ""):
-                return None
-            return resp.text
+            resp = self.session.get(url, timeout=DEFAULT_TIMEOUT, headers=headers, stream=True)
+            return self._read_html(resp)
         except requests.exceptions.RequestException as e:
             err = str(e).lower()
             if "name or service not known" in err or "getaddrinfo" in err or "temporary failure in name resolution" in err:
@@ -114,11 +186,8 @@ class EnhancedCrawler:
                         path += "?" + parsed.query
                     ip_url = f"{scheme}://{ip}{port}{path}"
                     headers = self._get_headers(host=host)
-                    resp = self.session.get(ip_url, timeout=DEFAULT_TIMEOUT, headers=headers, verify=True)
-                    resp.raise_for_status()
-                    if "text/html" not in resp.headers.get("content-type",""):
-                        return None
-                    return resp.text
+                    resp = self.session.get(ip_url, timeout=DEFAULT_TIMEOUT, headers=headers, verify=True, stream=True)
+                    return self._read_html(resp)
                 except Exception:
                     return None
             return None
@@ -127,11 +196,29 @@ class EnhancedCrawler:
         conn = db_connect()
         cur = conn.cursor()
         content_hash = self._compute_hash(content or summary or title or url)
+        # a queued recrawl refreshes the existing row in place
+        cur.execute("DELETE FROM crawl_queue WHERE url = ?", (url,))
+        queued = cur.rowcount > 0
         # dedupe by hash or url
-        cur.execute("SELECT id FROM pages WHERE content_hash = ? OR url = ?", (content_hash, url))
-        if cur.fetchone():
+        cur.execute("SELECT id, url, content_hash FROM pages WHERE content_hash = ? OR url = ?", (content_hash, url))
+        rows = cur.fetchall()
+        if rows:
+            changed = False
+            own = [r for r in rows if r["url"] == url]
+            if queued and own and len(own) == len(rows):
+                changed = own[0]["content_hash"] != content_hash
+                if changed:
+                    cur.execute(
+                        """UPDATE pages SET title = ?, summary = ?, content = ?, category = ?, language = ?,
+                        content_hash = ?, last_crawled = CURRENT_TIMESTAMP WHERE id = ?""",
+                        (title, summary, content, category, language, content_hash, own[0]["id"]))
+                else:
+                    cur.execute("UPDATE pages SET last_crawled = CURRENT_TIMESTAMP WHERE id = ?", (own[0]["id"],))
+                metrics.inc("crawl_recrawled", changed=changed)
+            conn.commit()
             conn.close()
-            return False
+            # a changed recrawl counts as stored so the caller rebuilds
+            return changed
         cur.execute(
             """INSERT OR IGNORE INTO pages (url, title, summary, content, category, language, content_hash)
             VALUES (?, ?, ?, ?, ?, ?, ?)""",
@@ -141,6 +228,20 @@ class EnhancedCrawler:
         conn.close()
         return True
 
+    def _queued_urls(self, categories=None, limit=100):
+        """URLs queued for a recrawl by index maintenance (oldest first)."""
+        conn = db_connect()
+        cur = conn.cursor()
+        sql = "SELECT url FROM crawl_queue"
+        params = []
+        if categories:
+            sql += f" WHERE category IN ({','.join('?' for _ in categories)})"
+            params.extend(categories)
+        cur.execute(sql + " ORDER BY queued_at LIMIT ?", params + [limit])
+        urls = [r["url"] for r in cur.fetchall()]
+        conn.close()
+        return urls
+
     def crawl(self, categories: Optional[List[str]] = None, keywords: Optional[List[str]] = None, max_pages: Optional[int] = None):
         # keywords: matches anywhere in content/title/summary (case-insensitive)
         kw_lower = [k.lower() for k in (keywords or []) if k]
@@ -150,20 +251,25 @@ class EnhancedCrawler:
         limit = max_pages or self.max_pages
         if categories:
             for c in categories:
-                frontier.extend(PRIMARY_SEEDS.get(c, []))
+                frontier.extend(self.seeds.get(c, []))
         else:
-            for urls in PRIMARY_SEEDS.values():
+            for urls in self.seeds.values():
                 frontier.extend(urls)
         random.shuffle(frontier)
+        # stale pages queued by maintenance go first
+        frontier[:0] = self._queued_urls(categories, limit)
         while frontier and len(stored) < limit:
             url = frontier.pop(0)
             if url in visited:
                 continue
             visited.add(url)
-            html = self._fetch(url)
+            with metrics.timer("crawl_fetch"):
+                html = self._fetch(url)
             if not html:
+                metrics.inc("crawl_pages", result="fetch_failed")
                 continue
-            title, summary, content = self._clean_text(html)
+            with metrics.timer("crawl_parse"):
+                title, summary, content = self._clean_text(html, url)
             text_for_check = " ".join([title, summary, content]).lower()
             # filter by keywords if given
             if kw_lower:
@@ -175,16 +281,22 @@ class EnhancedCrawler:
             else:
                 pass_store = True
             if not content or len(content) < MIN_CONTENT_LENGTH:
+                metrics.inc("crawl_pages", result="too_short")
                 continue
-            category = self._guess_category(url, content)
-            language = self._detect_language(content)
+            # one pass over the page for both tags
+            category, language = self.classifier.tag(content, url)
             if pass_store:
-                ok = self._store_page(url, title, summary, content, category, language)
+                with metrics.timer("crawl_store"):
+                    ok = self._store_page(url, title, summary, content, category, language)
+                metrics.inc("crawl_pages", result="stored" if ok else "duplicate")
                 if ok:
                     stored.append({"url": url, "title": title, "category": category})
+            else:
+                metrics.inc("crawl_pages", result="keyword_filtered")
             # expand frontier with trusted links found on this page
             try:
-                soup = BeautifulSoup(html, "html.parser")
+                with metrics.timer("crawl_parse"):
+                    soup = BeautifulSoup(html, "html.parser")
                 for a in soup.find_all("a", href=True):
                     href = a["href"]
                     abs_url = requests.compat.urljoin(url, href)
@@ -192,9 +304,14 @@ class EnhancedCrawler:
                         continue
                     parsed = requests.utils.urlparse(abs_url)
                     host = parsed.hostname or ""
-                    if host and any(host.endswith(s) for s in TRUSTED_SUFFIXES) and abs_url not in visited:
+                    if host and host.endswith(self.trusted_suffixes) and abs_url not in visited:
                         frontier.append(abs_url)
             except Exception:
                 pass
-            time.sleep(self.politeness + random.random()*0.5)
+            if self.politeness > 0:
+                time.sleep(self.politeness + random.random()*0.5)
         return stored
+
+    def run_crawl(self, categories: Optional[List[str]] = None, keywords: Optional[List[str]] = None):
+        """crawl() with this crawler's max_pages (used by routers/crawler_route)."""
+        return self.crawl(categories=categories, keywords=keywords)
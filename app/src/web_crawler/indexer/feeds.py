@@ -0,0 +1,197 @@
+# feeds.py
+# Per-user interest profiles and materialized feeds.
+#
+# Every search bumps exponentially decayed weights for the query's category
+# and terms (user_interests) and marks the user's feed dirty. refresh_feeds()
+# runs after a crawl and rebuilds only feeds that are dirty or whose
+# interests match pages added since that feed was built; everyone else just
+# has their page watermark advanced. /feed then reads user_feeds in rank order.
+#
+# Functions take an open sqlite3 connection/cursor (see indexer.db_connect).
+import re
+import sqlite3
+import threading
+import time
+from app.utils import metrics
+
+INTEREST_HALF_LIFE_DAYS = 14.0
+CATEGORY_BUMP = 1.0
+TERM_BUMP = 0.5
+MIN_WEIGHT = 0.05          # decayed weights below this are dropped
+MAX_CATEGORIES = 3
+MAX_TERMS = 10
+MAX_TERMS_PER_QUERY = 5
+FEED_SIZE = 50
+FEED_CANDIDATES = 200      # per category / for the term match
+STOP_TERMS = set("the and for with from what how when where which who why are was were this that about into "
+                 "your you can get all any new list apply online form scheme".split())
+
+_TERM_RE = re.compile(r"[^\s\"'|,.:;()\[\]?!/\\*-]+")
+_refresh_lock = threading.Lock()
+
+
+def query_terms(text: str, limit=MAX_TERMS_PER_QUERY):
+    """Distinct lowercase terms of a query/page text worth tracking as interests."""
+    terms = {}
+    for t in _TERM_RE.findall((text or "").lower()):
+        if len(t) >= 3 and t not in terms and t not in STOP_TERMS and not t.isdigit():
+            terms[t] = None
+            if limit and len(terms) >= limit:
+                break
+    return list(terms)
+
+
+def _decayed(weight, updated_at, now):
+    age_days = max(0.0, now - (updated_at or now)) / 86400.0
+    return weight * 0.5 ** (age_days / INTEREST_HALF_LIFE_DAYS)
+
+
+def _bump(cur, user_id, kind, value, amount, now):
+    cur.execute("SELECT weight, updated_at FROM user_interests WHERE user_id = ? AND kind = ? AND value = ?",
+                (user_id, kind, value))
+    row = cur.fetchone()
+    weight = (_decayed(row[0], row[1], now) if row else 0.0) + amount
+    cur.execute("""INSERT INTO user_interests (user_id, kind, value, weight, updated_at) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(user_id, kind, value) DO UPDATE SET weight = excluded.weight,
+                   updated_at = excluded.updated_at""", (user_id, kind, value, weight, now))
+
+
+def mark_dirty(cur, user_id):
+    cur.execute("""INSERT INTO user_feed_state (user_id, dirty) VALUES (?, 1)
+                   ON CONFLICT(user_id) DO UPDATE SET dirty = 1""", (user_id,))
+
+
+def record_search(cur, user_id: str, query: str, category=None, now=None):
+    """Append to search history, bump the user's interests and mark the feed dirty."""
+    now = now or time.time()
+    cur.execute("INSERT INTO search_history (user_id, query, category) VALUES (?, ?, ?)",
+                (user_id, query, category))
+    if category:
+        _bump(cur, user_id, "category", category, CATEGORY_BUMP, now)
+    for term in query_terms(query):
+        _bump(cur, user_id, "term", term, TERM_BUMP, now)
+    mark_dirty(cur, user_id)
+
+
+def load_interests(cur, user_id: str, now=None):
+    """{'category': [(value, weight)], 'term': [...]} by decayed weight, best first."""
+    now = now or time.time()
+    cur.execute("SELECT kind, value, weight, updated_at FROM user_interests WHERE user_id = ?", (user_id,))
+    out = {"category": [], "term": []}
+    for kind, value, weight, updated_at in cur.fetchall():
+        w = _decayed(weight, updated_at, now)
+        if w >= MIN_WEIGHT and kind in out:
+            out[kind].append((value, w))
+    for kind, limit in (("category", MAX_CATEGORIES), ("term", MAX_TERMS)):
+        out[kind] = sorted(out[kind], key=lambda x: x[1], reverse=True)[:limit]
+    return out
+
+
+def top_interests(cur, user_id: str):
+    """Top categories followed by top terms, as plain strings."""
+    interests = load_interests(cur, user_id)
+    out = [v for v, _ in interests["category"]]
+    return out + [v for v, _ in interests["term"] if v not in out]
+
+
+def _fts_term_query(terms):
+    return " OR ".join('"{}"'.format(t.replace('"', " ")) for t in terms)
+
+
+def build_feed(cur, user_id: str, now=None):
+    """Recompute and store one user's feed. Returns the number of items."""
+    interests = load_interests(cur, user_id, now)
+    cats = dict(interests["category"])
+    terms = dict(interests["term"])
+    total = sum(cats.values()) + sum(terms.values()) or 1.0
+
+    candidates = {}
+    for cat in cats:
+        cur.execute("SELECT id, category, title, summary FROM pages WHERE category = ? ORDER BY id DESC LIMIT ?",
+                    (cat, FEED_CANDIDATES))
+        for row in cur.fetchall():
+            candidates[row[0]] = row
+    if terms:
+        try:
+            # newest matches by rowid: ordering by bm25 rank would score every
+            # match of a common term, rowid order stops after LIMIT rows
+            cur.execute("""SELECT p.id, p.category, p.title, p.summary FROM pages_fts f
+                           JOIN pages p ON f.rowid = p.id
+                           WHERE pages_fts MATCH ? ORDER BY f.rowid DESC LIMIT ?""",
+                        (_fts_term_query(terms), FEED_CANDIDATES))
+            for row in cur.fetchall():
+                candidates[row[0]] = row
+        except sqlite3.OperationalError:
+            # odd terms can still trip the FTS5 parser; categories alone will do
+            pass
+
+    scored = []
+    for page_id, category, title, summary in candidates.values():
+        words = set(query_terms(f"{title or ''} {summary or ''}", limit=None))
+        score = cats.get(category, 0.0) + sum(w for t, w in terms.items() if t in words)
+        if score > 0:
+            scored.append((score / total, page_id))
+    scored.sort(key=lambda x: (-x[0], -x[1]))
+
+    cur.execute("DELETE FROM user_feeds WHERE user_id = ?", (user_id,))
+    cur.executemany("INSERT INTO user_feeds (user_id, rank, page_id, score) VALUES (?, ?, ?, ?)",
+                    [(user_id, i, page_id, score) for i, (score, page_id) in enumerate(scored[:FEED_SIZE])])
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM pages")
+    last_page_id = cur.fetchone()[0]
+    cur.execute("""INSERT INTO user_feed_state (user_id, dirty, last_page_id, built_at) VALUES (?, 0, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET dirty = 0, last_page_id = excluded.last_page_id,
+                   built_at = excluded.built_at""", (user_id, last_page_id, now or time.time()))
+    metrics.inc("feeds_rebuilt")
+    return min(len(scored), FEED_SIZE)
+
+
+def refresh_feeds(conn):
+    """
+    Rebuild dirty feeds and feeds whose interests match pages added since
+    they were built; advance the watermark of all the others.
+    Returns (rebuilt, skipped).
+    """
+    with _refresh_lock, metrics.timer("feed_refresh"):
+        cur = conn.cursor()
+        now = time.time()
+        cur.execute("SELECT user_id FROM user_feed_state WHERE dirty = 1")
+        to_build = {r[0] for r in cur.fetchall()}
+        cur.execute("SELECT user_id, last_page_id FROM user_feed_state WHERE dirty = 0")
+        clean = cur.fetchall()
+        skipped = []
+        if clean:
+            # newest page id per category / per term among the pages added
+            # since the oldest watermark: one pass over the new pages only
+            since = min(last for _, last in clean)
+            cur.execute("SELECT id, category, title, summary FROM pages WHERE id > ?", (since,))
+            newest_by_cat, newest_by_term = {}, {}
+            max_id = since
+            for page_id, category, title, summary in cur.fetchall():
+                max_id = max(max_id, page_id)
+                newest_by_cat[category] = max(newest_by_cat.get(category, 0), page_id)
+                for t in query_terms(f"{title or ''} {summary or ''}", limit=None):
+                    newest_by_term[t] = max(newest_by_term.get(t, 0), page_id)
+            for user_id, last in clean:
+                if last >= max_id:
+                    continue
+                interests = load_interests(cur, user_id, now)
+                if any(newest_by_cat.get(c, 0) > last for c, _ in interests["category"]) or \
+                        any(newest_by_term.get(t, 0) > last for t, _ in interests["term"]):
+                    to_build.add(user_id)
+                else:
+                    skipped.append((max_id, user_id))
+            cur.executemany("UPDATE user_feed_state SET last_page_id = ? WHERE user_id = ?", skipped)
+        for user_id in to_build:
+            build_feed(cur, user_id, now)
+        conn.commit()
+        metrics.inc("feeds_skipped", len(skipped))
+        print(f"[feeds] rebuilt {len(to_build)} feeds, {len(skipped)} unchanged")
+        return len(to_build), len(skipped)
+
+
+def read_feed(cur, user_id: str, limit=5):
+    """The materialized feed: one read of user_feeds (PK order) joined to pages."""
+    cur.execute("""SELECT p.url, p.title, p.summary, p.category, p.language, p.last_crawled, f.score
+                   FROM user_feeds f JOIN pages p ON p.id = f.page_id
+                   WHERE f.user_id = ? ORDER BY f.rank LIMIT ?""", (user_id, limit))
+    return [dict(r) for r in cur.fetchall()]
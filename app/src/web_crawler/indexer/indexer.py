@@ -1,11 +1,55 @@
 # database.py
+import hashlib
+import re
 import sqlite3
+import threading
+import time
+from app.utils import metrics
+from app.src.web_crawler.indexer.trie import SuggestionTrie
+from app.src.web_crawler.indexer import feeds, pagination
 
 DB_PATH = "storage.db"
 
+# typeahead: titles are also indexed from their 2nd..Nth word so "kisan"
+# finds "PM Kisan Samman Nidhi"; a past query becomes a suggestion once it
+# has been searched QUERY_MIN_COUNT times
+SUGGEST_TOP_K = 8
+SUGGEST_MAX_CHARS = 80
+TITLE_SUFFIX_WORDS = 3
+TITLE_SCORE = 1.0
+SCHEME_SCORE = 0.5       # per page mentioning the scheme
+QUERY_SCORE = 2.0        # per search
+QUERY_MIN_COUNT = 2
+# scheme names: up to SCHEME_MAX_WORDS words before one of these, capitalized
+# for the Latin ones ("PM Kisan Samman Yojana", "सरकारी योजना")
+SCHEME_WORDS = ("Yojana", "Yojna", "Scheme", "Mission", "Abhiyan", "योजना")
+SCHEME_MAX_WORDS = 5
+_SCHEME_WORD_RE = re.compile("|".join(SCHEME_WORDS))
+_SCHEME_STOP_CHARS = set("|,.:;()[]\"")
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that reports how long it was held open."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._opened = time.perf_counter()
+        metrics.inc("db_connections")
+        metrics.gauge_add("db_connections_open", 1)
+
+    def close(self):
+        if self._opened is not None:
+            metrics.observe("db_connection_seconds", time.perf_counter() - self._opened)
+            metrics.gauge_add("db_connections_open", -1)
+            self._opened = None
+        super().close()
+
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
+    # lets maintenance hand free pages back in small steps; only takes effect
+    # on a new database (an existing one keeps its mode until a full VACUUM)
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS pages (
         id INTEGER PRIMARY KEY,
@@ -30,15 +74,522 @@ def init_db():
         VALUES (new.id, new.url, new.title, new.summary, new.content, new.category, new.language);
     END;
     """)
+    # per-user search history (feeds /users/{id}/history and interests)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS search_history (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT,
+        query TEXT,
+        category TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_search_history_user ON search_history(user_id, created_at)")
+    # global query popularity for suggestions
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS query_stats (
+        query TEXT PRIMARY KEY,
+        count INTEGER DEFAULT 0,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    # decayed interest weights per user (kind = 'category' | 'term')
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS user_interests (
+        user_id TEXT,
+        kind TEXT,
+        value TEXT,
+        weight REAL,
+        updated_at REAL,
+        PRIMARY KEY (user_id, kind, value)
+    )""")
+    # materialized feeds: /feed reads one user's rows in rank order
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS user_feeds (
+        user_id TEXT,
+        rank INTEGER,
+        page_id INTEGER,
+        score REAL,
+        PRIMARY KEY (user_id, rank)
+    )""")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS user_feed_state (
+        user_id TEXT PRIMARY KEY,
+        dirty INTEGER DEFAULT 1,
+        last_page_id INTEGER DEFAULT 0,
+        built_at REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_feed_state_dirty ON user_feed_state(dirty)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pages_category ON pages(category, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_crawled ON pages(last_crawled)")
+    # pages due for a recrawl (stale-page maintenance); the crawler drains it
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS crawl_queue (
+        url TEXT PRIMARY KEY,
+        category TEXT,
+        queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    # per-host text block fingerprints for boilerplate removal (crawler_spider/boilerplate.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS host_blocks (
+        host TEXT,
+        fingerprint INTEGER,
+        pages INTEGER,
+        last_seen INTEGER,
+        PRIMARY KEY (host, fingerprint)
+    ) WITHOUT ROWID""")
+    cur.execute("CREATE TABLE IF NOT EXISTS host_pages (host TEXT PRIMARY KEY, pages INTEGER)")
+    # url fingerprints already counted into host_blocks / host_pages
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS host_urls (
+        host TEXT,
+        url_fp INTEGER,
+        PRIMARY KEY (host, url_fp)
+    ) WITHOUT ROWID""")
+    # external-content FTS5 rows must be removed with the 'delete' command and
+    # the old values; a plain DELETE after the row is gone leaves its tokens.
+    # Older databases have a different pages_ad: it is replaced under a write
+    # lock so workers starting together don't race on drop/create.
+    pages_ad = """CREATE TRIGGER pages_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, url, title, summary, content, category, language)
+        VALUES ('delete', old.id, old.url, old.title, old.summary, old.content, old.category, old.language);
+    END"""
+    conn.commit()
+    cur.execute("BEGIN IMMEDIATE")
+    cur.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'pages_ad'")
+    row = cur.fetchone()
+    if row is None or row[0] != pages_ad:
+        cur.execute("DROP TRIGGER IF EXISTS pages_ad")
+        cur.execute(pages_ad)
+    conn.commit()
+    # recrawled pages are updated in place
     cur.execute("""
-    CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
-        DELETE FROM pages_fts WHERE rowid=old.id;
+    CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE OF url, title, summary, content, category, language ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, url, title, summary, content, category, language)
+        VALUES ('delete', old.id, old.url, old.title, old.summary, old.content, old.category, old.language);
+        INSERT INTO pages_fts(rowid, url, title, summary, content, category, language)
+        VALUES (new.id, new.url, new.title, new.summary, new.content, new.category, new.language);
     END;
     """)
     conn.commit()
     conn.close()
 
 def db_connect():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
     return conn
+
+def fts_candidates(cur, q: str, category=None, lang=None, limit=100):
+    """Page ids matching q through FTS5 (prefix match on the last token)."""
+    fts_query = q.replace('"', ' ')  # basic sanitize
+    sql = """
+    SELECT p.id
+    FROM pages_fts f
+    JOIN pages p ON f.rowid = p.id
+    WHERE pages_fts MATCH ?
+    """
+    params = [fts_query + "*"]
+    if category:
+        sql += " AND p.category = ?"
+        params.append(category)
+    if lang:
+        sql += " AND p.language = ?"
+        params.append(lang)
+    sql += " LIMIT ?"
+    params.append(limit)
+    try:
+        cur.execute(sql, params)
+    except sqlite3.OperationalError:
+        # FTS5 syntax error from user input
+        return []
+    return [r["id"] for r in cur.fetchall()]
+
+def like_candidates(cur, q: str, category=None, lang=None, limit=100):
+    """Fallback substring search over title/summary/content."""
+    like_q = f"%{q}%"
+    sql = "SELECT id FROM pages WHERE (title LIKE ? OR summary LIKE ? OR content LIKE ?)"
+    params = [like_q, like_q, like_q]
+    if category:
+        sql += " AND category = ?"
+        params.append(category)
+    if lang:
+        sql += " AND language = ?"
+        params.append(lang)
+    sql += " LIMIT ?"
+    params.append(limit)
+    cur.execute(sql, params)
+    return [r["id"] for r in cur.fetchall()]
+
+def rank_pages(cur, q: str, category=None, lang=None, depth=100, rank=True):
+    """
+    Ranked [(page id, score)] for q, at most depth long: FTS5 candidates
+    (LIKE fallback), re-ranked by hybrid semantic scoring when rank is set,
+    and restricted to category/lang (dense hits may come from anywhere).
+    """
+    with metrics.timer("fts"):
+        candidate_ids = fts_candidates(cur, q, category, lang, depth)
+    # If no candidates from FTS, fallback to simple LIKE search
+    if not candidate_ids:
+        metrics.inc("search_like_fallbacks")
+        with metrics.timer("like"):
+            candidate_ids = like_candidates(cur, q, category, lang, depth)
+    # Semantic re-ranking + dense retrieval; without it keep FTS order
+    if rank:
+        from app.src.semantic_using_NLP.semantic import hybrid_rank
+        with metrics.timer("rank"):
+            scored = hybrid_rank(q, candidate_ids, top_k=depth, lang=lang, category=category)
+    else:
+        metrics.inc("search_unranked")
+        scored = [(doc_id, None) for doc_id in candidate_ids]
+    if scored and (category or lang):
+        placeholders = ",".join("?" for _ in scored)
+        sql = f"SELECT id FROM pages WHERE id IN ({placeholders})"
+        params = [doc_id for doc_id, _ in scored]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        if lang:
+            sql += " AND language = ?"
+            params.append(lang)
+        cur.execute(sql, params)
+        keep = {r["id"] for r in cur.fetchall()}
+        scored = [(doc_id, score) for doc_id, score in scored if doc_id in keep]
+    return scored
+
+def hydrate(cur, scored):
+    """Result dicts for [(page id, score)] in that order, from one query."""
+    if not scored:
+        return []
+    placeholders = ",".join("?" for _ in scored)
+    with metrics.timer("hydrate"):
+        cur.execute(f"SELECT id, url, title, summary, category, language FROM pages WHERE id IN ({placeholders})",
+                    [doc_id for doc_id, _ in scored])
+        docs = {r["id"]: r for r in cur.fetchall()}
+    results = []
+    for doc_id, score in scored:
+        r = docs.get(doc_id)
+        if not r:
+            continue
+        results.append({
+            "url": r["url"],
+            "title": r["title"] or "",
+            "summary": r["summary"] or "",
+            "category": r["category"] or "",
+            "language": r["language"] or "english",
+            "score": round(score, 6) if score is not None else None
+        })
+    return results
+
+def search_pages(q: str, category=None, lang=None, limit=20, rank=True):
+    """Top `limit` results for q (candidates: limit * 5)."""
+    conn = db_connect()
+    cur = conn.cursor()
+    results = hydrate(cur, rank_pages(cur, q, category, lang, limit * 5, rank)[:limit])
+    conn.close()
+    return results
+
+_result_lists = pagination.ResultListCache()
+
+def index_generation(cur, rank=True):
+    """
+    Changes whenever new pages or a new semantic generation could change a
+    ranked list. Deleted pages don't count: hydrate() just skips them.
+    """
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS m FROM pages")
+    parts = str(cur.fetchone()["m"])
+    if rank:
+        from app.src.semantic_using_NLP.semantic import index_generation as semantic_generation
+        parts += ":" + semantic_generation()
+    return hashlib.sha1(parts.encode("utf-8")).hexdigest()[:12]
+
+def search_pages_cursor(q: str, category=None, lang=None, limit=20, cursor=None, rank=True):
+    """
+    One page of results plus the cursor for the next one (None at the end).
+    The ranked list is computed once per query and generation; following
+    pages cost a cache lookup and one hydration query. Raises
+    pagination.CursorError for malformed cursors, cursors for another
+    query, and cursors from an older index generation.
+    """
+    phash = pagination.params_hash(q, category, lang)
+    conn = db_connect()
+    cur = conn.cursor()
+    try:
+        generation = index_generation(cur, rank)
+        token, offset = None, 0
+        if cursor:
+            token, offset, cursor_generation, cursor_phash = pagination.decode_cursor(cursor)
+            if cursor_phash != phash:
+                raise pagination.CursorError("cursor belongs to a different query")
+            if cursor_generation != generation:
+                metrics.inc("search_cursor_stale")
+                raise pagination.CursorError("index changed since this cursor was issued; restart from page 1")
+        entry = _result_lists.get(token) if token else None
+        if entry is not None and entry[0] == generation and entry[1] == phash:
+            ranked = entry[2]
+            metrics.inc("search_cursor_hits")
+        else:
+            if token:
+                # expired, or issued by another worker: same generation ranks the same
+                metrics.inc("search_cursor_misses")
+            depth = max(limit * 5, pagination.RESULT_LIST_DEPTH)
+            ranked = rank_pages(cur, q, category, lang, depth, rank)
+            token = _result_lists.put(generation, phash, ranked, token)
+        results = hydrate(cur, ranked[offset:offset + limit])
+    finally:
+        conn.close()
+    end = offset + limit
+    next_cursor = pagination.encode_cursor(token, end, generation, phash) if end < len(ranked) else None
+    return results, next_cursor
+
+def _normalize_query(q: str) -> str:
+    return " ".join((q or "").lower().split())[:SUGGEST_MAX_CHARS]
+
+def _extract_schemes(text: str):
+    # anchor on the (rare) scheme word and look back, instead of running a
+    # backtracking pattern from every word of the page
+    found = set()
+    text = text or ""
+    for m in _SCHEME_WORD_RE.finditer(text):
+        word = m.group(0)
+        latin = word.isascii()
+        after = text[m.end():m.end() + 1]
+        if latin and after and after.isalnum():
+            continue
+        before = text[max(0, m.start() - SUGGEST_MAX_CHARS):m.start()]
+        if not before or not before[-1].isspace():
+            continue
+        names = []
+        for w in reversed(before.split()):
+            if len(names) >= SCHEME_MAX_WORDS or w in SCHEME_WORDS or _SCHEME_STOP_CHARS & set(w):
+                break
+            if latin and not w[0].isupper():
+                break
+            names.append(w)
+        if names:
+            found.add(" ".join(reversed(names)) + " " + word)
+    return found
+
+# one suggestion trie per process, shared by every RuralSearchEngine instance.
+# New pages are added in place; scores only grow, so pages deleted or retitled
+# since the last pass (expiry, recrawls) mean a rebuild into a fresh trie
+# that is swapped in when complete.
+_trie_lock = threading.Lock()
+_trie_state = {"trie": SuggestionTrie(k=SUGGEST_TOP_K), "last_page_id": 0, "pages": 0,
+               "last_crawled": "", "built": False}
+
+
+class SearchIndexer:
+    """Suggestion index over pages and past queries, plus query/catalogue stats."""
+
+    @property
+    def trie(self):
+        return _trie_state["trie"]
+
+    @staticmethod
+    def _index_title(trie, title: str):
+        title = " ".join((title or "").split())[:SUGGEST_MAX_CHARS]
+        if not title:
+            return
+        words = title.split()
+        # the full title, then the same title reachable from its next few words
+        for start in range(min(len(words), TITLE_SUFFIX_WORDS + 1)):
+            trie.add(" ".join(words[start:]), display=title, score=TITLE_SCORE)
+
+    def _build_inverted_index(self, blocking=True):
+        """
+        Bring the suggestion trie up to date: pages with an id above the last
+        indexed one (titles + scheme names) and, on the first build, popular
+        past queries; rebuilt from scratch if indexed pages were deleted or
+        retitled. Cheap to call after every crawl. Returns pages indexed;
+        with blocking=False, 0 right away if another thread is building.
+        """
+        if not _trie_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            with metrics.timer("suggest_index"):
+                conn = db_connect()
+                try:
+                    if _trie_state["built"] and self._trie_stale(conn):
+                        metrics.inc("suggest_rebuilds")
+                        state = {"trie": SuggestionTrie(k=SUGGEST_TOP_K), "last_page_id": 0, "pages": 0,
+                                 "last_crawled": "", "built": False}
+                    else:
+                        state = _trie_state
+                    n = self._index_pages(conn, state)
+                    # a rebuild is published only once complete
+                    _trie_state.update(state)
+                finally:
+                    conn.close()
+        finally:
+            _trie_lock.release()
+        metrics.inc("suggest_pages_indexed", n)
+        return n
+
+    @staticmethod
+    def _trie_stale(conn):
+        """True if an indexed page was deleted, or recrawled under a title the trie lacks."""
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM pages WHERE id <= ?", (_trie_state["last_page_id"],))
+        if cur.fetchone()[0] < _trie_state["pages"]:
+            return True
+        # >= : rows recrawled within the watermark's second are checked again
+        cur.execute("SELECT title, last_crawled FROM pages WHERE id <= ? AND last_crawled >= ?",
+                    (_trie_state["last_page_id"], _trie_state["last_crawled"]))
+        trie = _trie_state["trie"]
+        for r in cur:
+            title = " ".join((r["title"] or "").split())[:SUGGEST_MAX_CHARS]
+            if title and title not in trie:
+                return True
+            _trie_state["last_crawled"] = max(_trie_state["last_crawled"], r["last_crawled"] or "")
+        return False
+
+    def _index_pages(self, conn, state):
+        cur = conn.cursor()
+        trie = state["trie"]
+        cur.execute("SELECT id, title, summary, content, last_crawled FROM pages WHERE id > ? ORDER BY id",
+                    (state["last_page_id"],))
+        n = 0
+        for r in cur:
+            self._index_title(trie, r["title"])
+            text = " ".join(filter(None, (r["title"], r["summary"], r["content"])))
+            for scheme in _extract_schemes(text):
+                trie.add(scheme, score=SCHEME_SCORE, increment=True)
+            state["last_page_id"] = r["id"]
+            state["last_crawled"] = max(state["last_crawled"], r["last_crawled"] or "")
+            n += 1
+        state["pages"] += n
+        if not state["built"]:
+            cur.execute("SELECT query, count FROM query_stats WHERE count >= ?", (QUERY_MIN_COUNT,))
+            for r in cur.fetchall():
+                trie.add(r["query"], score=r["count"] * QUERY_SCORE)
+            state["built"] = True
+        return n
+
+    def _ensure_index(self):
+        # never waits on a build in progress (warm-up, post-crawl refresh):
+        # suggestions come from whatever is indexed so far
+        if not _trie_state["built"]:
+            self._build_inverted_index(blocking=False)
+
+    def suggest(self, prefix: str, k=SUGGEST_TOP_K):
+        self._ensure_index()
+        return self.trie.suggest(prefix, k)
+
+    def record_query(self, query: str):
+        """Count a search; frequent queries join the suggestions."""
+        q = _normalize_query(query)
+        if not q:
+            return
+        conn = db_connect()
+        cur = conn.cursor()
+        cur.execute("""INSERT INTO query_stats (query, count) VALUES (?, 1)
+                       ON CONFLICT(query) DO UPDATE SET count = count + 1, last_seen = CURRENT_TIMESTAMP""", (q,))
+        cur.execute("SELECT count FROM query_stats WHERE query = ?", (q,))
+        count = cur.fetchone()["count"]
+        conn.commit()
+        conn.close()
+        if count >= QUERY_MIN_COUNT:
+            self._ensure_index()
+            self.trie.add(q, score=count * QUERY_SCORE)
+
+    def map_query_to_category(self, query: str):
+        """Most likely category for a query, or None if no keyword matched."""
+        from app.src.web_crawler.crawler_spider.classifier import get_classifier
+        ranked = get_classifier().classify(query or "")["category"]
+        return ranked[0][0] if ranked else None
+
+    def get_statistics(self):
+        conn = db_connect()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) AS n, MAX(last_crawled) AS last FROM pages")
+        row = cur.fetchone()
+        cur.execute("SELECT category, COUNT(*) AS n FROM pages GROUP BY category")
+        by_category = {r["category"] or "unknown": r["n"] for r in cur.fetchall()}
+        cur.execute("SELECT language, COUNT(*) AS n FROM pages GROUP BY language")
+        by_language = {r["language"] or "unknown": r["n"] for r in cur.fetchall()}
+        cur.execute("SELECT COUNT(*) AS n, COUNT(DISTINCT user_id) AS users FROM search_history")
+        history = cur.fetchone()
+        conn.close()
+        return {
+            "total_pages": row["n"],
+            "last_crawled": row["last"],
+            "pages_by_category": by_category,
+            "pages_by_language": by_language,
+            "total_searches": history["n"],
+            "users": history["users"],
+            "suggestion_terms": len(self.trie),
+            "suggestion_nodes": self.trie.size,
+        }
+
+
+class RuralSearchEngine:
+    """Search + typeahead + per-user history/interests on top of storage.db."""
+
+    def __init__(self):
+        self.indexer = SearchIndexer()
+
+    def search(self, query: str, user_id: str = "default", category=None, limit=10, lang=None):
+        category = category or None
+        conn = db_connect()
+        feeds.record_search(conn.cursor(), user_id, query, category or self.indexer.map_query_to_category(query))
+        conn.commit()
+        conn.close()
+        self.indexer.record_query(query)
+        return search_pages(query, category, lang, limit)
+
+    def get_search_suggestions(self, query: str, limit=SUGGEST_TOP_K):
+        with metrics.timer("suggest"):
+            return self.indexer.suggest(query, limit)
+
+    def get_personalized_feed(self, user_id: str, limit=5):
+        """
+        The user's materialized feed. A feed marked dirty by a search since
+        the last refresh is rebuilt first; users without history get the
+        latest pages.
+        """
+        with metrics.timer("feed"):
+            conn = db_connect()
+            cur = conn.cursor()
+            cur.execute("SELECT dirty FROM user_feed_state WHERE user_id = ?", (user_id,))
+            state = cur.fetchone()
+            if state is None:
+                cur.execute("""SELECT url, title, summary, category, language, last_crawled FROM pages
+                               ORDER BY id DESC LIMIT ?""", (limit,))
+                items = [dict(r) for r in cur.fetchall()]
+            else:
+                if state["dirty"]:
+                    feeds.build_feed(cur, user_id)
+                    conn.commit()
+                items = feeds.read_feed(cur, user_id, limit)
+            conn.close()
+        return items
+
+    def _get_user_interests(self, user_id: str):
+        conn = db_connect()
+        interests = feeds.top_interests(conn.cursor(), user_id)
+        conn.close()
+        return interests
+
+    def _get_user_search_history(self, user_id: str, limit=20):
+        conn = db_connect()
+        cur = conn.cursor()
+        cur.execute("""SELECT query, category, created_at FROM search_history
+                       WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?""", (user_id, limit))
+        history = [{"query": r["query"], "category": r["category"] or "", "timestamp": r["created_at"]}
+                   for r in cur.fetchall()]
+        conn.close()
+        return history
+
+    def _clear_user_history(self, user_id: str):
+        conn = db_connect()
+        for table in ("search_history", "user_interests", "user_feeds", "user_feed_state"):
+            conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        conn.commit()
+        conn.close()
+
+def refresh_after_crawl():
+    """Fold newly crawled pages into the suggestion trie and the affected feeds."""
+    SearchIndexer()._build_inverted_index()
+    conn = db_connect()
+    try:
+        feeds.refresh_feeds(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,228 @@
+# maintenance.py
+# Index upkeep in small, time-budgeted steps so it can run next to live
+# traffic: stale-page re-queue/expiry, FTS5 segment merging, planner stats
+# and incremental vacuum. Each step commits on its own and stops once its
+# share of the budget is spent; whatever is left is picked up next run.
+import os
+import time
+from contextlib import contextmanager
+from app.utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows: every worker runs its own passes
+    fcntl = None
+
+# days after last_crawled before a page is queued for a recrawl; pages older
+# than EXPIRE_FACTOR * TTL that sat in the queue for a whole TTL without being
+# refreshed are deleted (so a stalled crawler can't empty the index at once)
+PAGE_TTL_DAYS = {
+    "health": 30,
+    "agriculture": 30,
+    "education": 90,
+    "government": 60,
+}
+DEFAULT_PAGE_TTL_DAYS = 60
+EXPIRE_FACTOR = 3
+EXPIRE_BATCH = 200
+
+FTS_MERGE_PAGES = 500          # leaf pages written per 'merge' call
+FTS_OPTIMIZE_INTERVAL = 24 * 3600
+VACUUM_STEP_PAGES = 256
+# a database created without auto_vacuum (init_db's pragma only applies to
+# new files) needs one full VACUUM to switch to incremental mode. It rewrites
+# the whole file under the write lock, so a pass does it only for files up to
+# VACUUM_CONVERT_MAX_MB, or inside MAINTENANCE_WINDOW (local hours [start, end))
+VACUUM_CONVERT_MAX_MB = 200
+MAINTENANCE_WINDOW = (2, 5)
+PROBE_QUERIES = ["health", "scheme", "school", "kisan", "pension", "योजना"]
+
+_last_optimize = 0.0
+
+
+@contextmanager
+def maintenance_lock(db_path):
+    """
+    Non-blocking exclusive lock on <db_path>.maintenance.lock, so one uvicorn
+    worker runs a pass while the others skip it. Yields True if acquired.
+    """
+    with open(db_path + ".maintenance.lock", "a") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _sqlite_ts(days_ago):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - days_ago * 86400))
+
+
+def _ttl_groups(cur):
+    """[(category or None, ttl days)]; None covers every unlisted category."""
+    cur.execute("SELECT DISTINCT category FROM pages")
+    cats = [r[0] for r in cur.fetchall()]
+    return [(c, PAGE_TTL_DAYS.get(c, DEFAULT_PAGE_TTL_DAYS)) for c in cats]
+
+
+def expire_stale(conn, deadline):
+    """
+    Queue pages older than their category TTL for a recrawl and delete the
+    expired ones together with their queue rows (see PAGE_TTL_DAYS).
+    Returns (queued, deleted).
+    """
+    cur = conn.cursor()
+    queued = deleted = 0
+    for category, ttl in _ttl_groups(cur):
+        cat_sql = "category IS ?" if category is None else "category = ?"
+        # re-queue: pages stay searchable until the crawler refreshes them
+        cur.execute(f"""INSERT OR IGNORE INTO crawl_queue (url, category)
+                        SELECT url, category FROM pages WHERE {cat_sql} AND last_crawled < ?""",
+                    (category, _sqlite_ts(ttl)))
+        queued += cur.rowcount
+        conn.commit()
+        cutoff = _sqlite_ts(ttl * EXPIRE_FACTOR)
+        while time.perf_counter() < deadline:
+            cur.execute(f"""DELETE FROM pages WHERE id IN (
+                            SELECT p.id FROM pages p JOIN crawl_queue q ON q.url = p.url
+                            WHERE p.{cat_sql} AND p.last_crawled < ? AND q.queued_at < ? LIMIT ?)""",
+                        (category, cutoff, _sqlite_ts(ttl), EXPIRE_BATCH))
+            n = cur.rowcount
+            conn.commit()
+            deleted += n
+            if n < EXPIRE_BATCH:
+                break
+    if deleted:
+        # an expired page's queue row would otherwise lead every crawl forever
+        cur.execute("""DELETE FROM crawl_queue WHERE NOT EXISTS (
+                       SELECT 1 FROM pages p WHERE p.url = crawl_queue.url)""")
+        conn.commit()
+    metrics.inc("maintenance_pages_queued", queued)
+    metrics.inc("maintenance_pages_expired", deleted)
+    return queued, deleted
+
+
+def merge_fts(conn, deadline):
+    """
+    Incremental FTS5 'merge' until the segments are merged or the budget is
+    spent; a full 'optimize' at most once per FTS_OPTIMIZE_INTERVAL.
+    Returns the number of merge calls.
+    """
+    global _last_optimize
+    calls = 0
+    while time.perf_counter() < deadline:
+        before = conn.total_changes
+        conn.execute("INSERT INTO pages_fts(pages_fts, rank) VALUES ('merge', ?)", (FTS_MERGE_PAGES,))
+        conn.commit()
+        calls += 1
+        # fewer than 2 changes: nothing left to merge (see the FTS5 docs)
+        if conn.total_changes - before < 2:
+            if time.time() - _last_optimize > FTS_OPTIMIZE_INTERVAL and time.perf_counter() < deadline:
+                conn.execute("INSERT INTO pages_fts(pages_fts) VALUES ('optimize')")
+                conn.commit()
+                _last_optimize = time.time()
+            break
+    return calls
+
+
+def analyze(conn):
+    """Planner statistics: a full ANALYZE the first time, PRAGMA optimize after."""
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cur.fetchone() is None:
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA optimize")
+    conn.commit()
+
+
+def convert_auto_vacuum(conn, db_path):
+    """One-time switch to auto_vacuum=INCREMENTAL, when size or the hour allow. Returns True if converted."""
+    cur = conn.cursor()
+    if cur.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    size_mb = os.path.getsize(db_path) / 1e6 if os.path.exists(db_path) else 0.0
+    start, end = MAINTENANCE_WINDOW
+    if size_mb > VACUUM_CONVERT_MAX_MB and not start <= time.localtime().tm_hour < end:
+        return False
+    conn.commit()
+    t0 = time.perf_counter()
+    # VACUUM can't run inside a transaction; executescript commits first
+    conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+    metrics.inc("maintenance_vacuum_conversions")
+    print(f"[maintenance] converted {size_mb:.1f} MB database to incremental auto_vacuum "
+          f"in {time.perf_counter() - t0:.2f}s")
+    return True
+
+
+def incremental_vacuum(conn, deadline):
+    """Return free pages to the OS in VACUUM_STEP_PAGES steps. Returns pages freed."""
+    cur = conn.cursor()
+    if cur.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    conn.commit()
+    start = free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    while free and time.perf_counter() < deadline:
+        # executescript steps the pragma to completion; execute() stops after
+        # the first step, which frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+        free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    return start - free
+
+
+def snapshot(conn, db_path):
+    """Size / fragmentation numbers and median FTS probe latency (ms)."""
+    cur = conn.cursor()
+    page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+    latencies = []
+    for q in PROBE_QUERIES:
+        t0 = time.perf_counter()
+        cur.execute("SELECT rowid FROM pages_fts WHERE pages_fts MATCH ? LIMIT 100", (f'"{q}"',)).fetchall()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+    return {
+        "file_mb": os.path.getsize(db_path) / 1e6 if os.path.exists(db_path) else 0.0,
+        "free_mb": cur.execute("PRAGMA freelist_count").fetchone()[0] * page_size / 1e6,
+        "pages": cur.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+        "fts_blocks": cur.execute("SELECT COUNT(*) FROM pages_fts_data").fetchone()[0],
+        "queued": cur.execute("SELECT COUNT(*) FROM crawl_queue").fetchone()[0],
+        "probe_ms": latencies[len(latencies) // 2],
+    }
+
+
+def _fmt(snap):
+    return (f"{snap['file_mb']:.1f} MB file ({snap['free_mb']:.1f} MB free), {snap['pages']} pages, "
+            f"{snap['fts_blocks']} fts blocks, {snap['queued']} queued, probe {snap['probe_ms']:.2f} ms")
+
+
+def run_maintenance(conn, db_path, budget_seconds=2.0):
+    """
+    One maintenance pass within roughly budget_seconds of work. Logs
+    before/after numbers and returns a dict with both plus what was done.
+    """
+    t0 = time.perf_counter()
+    before = snapshot(conn, db_path)
+    print(f"[maintenance] before: {_fmt(before)}")
+    # expiry first (it creates free pages and FTS deletes), then compaction
+    with metrics.timer("maintenance_expire"):
+        queued, deleted = expire_stale(conn, time.perf_counter() + budget_seconds * 0.3)
+    with metrics.timer("maintenance_fts_merge"):
+        merges = merge_fts(conn, time.perf_counter() + budget_seconds * 0.4)
+    with metrics.timer("maintenance_analyze"):
+        analyze(conn)
+    with metrics.timer("maintenance_vacuum"):
+        converted = convert_auto_vacuum(conn, db_path)
+        freed = incremental_vacuum(conn, time.perf_counter() + budget_seconds * 0.3)
+    after = snapshot(conn, db_path)
+    print(f"[maintenance] after:  {_fmt(after)}")
+    print(f"[maintenance] queued {queued}, expired {deleted}, {merges} fts merge steps, "
+          f"freed {freed} db pages in {time.perf_counter() - t0:.2f}s")
+    return {"before": before, "after": after, "queued": queued, "deleted": deleted,
+            "merges": merges, "freed_pages": freed, "vacuum_converted": converted}
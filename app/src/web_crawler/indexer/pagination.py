@@ -0,0 +1,82 @@
+# pagination.py
+# Cursor pagination for /search. The first page ranks RESULT_LIST_DEPTH ids
+# once and keeps the (already filtered) list in a small TTL/LRU cache; later
+# pages slice that list and hydrate only the ids they return.
+#
+# A cursor is urlsafe-base64 JSON: {"k": list token, "o": offset,
+# "g": index generation, "p": hash of q/category/lang}. A cursor from an
+# older generation is refused; a cache miss (expired, other worker) is
+# recomputed, which gives the same list while the generation is unchanged.
+import base64
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_LIST_DEPTH = 200
+RESULT_LIST_TTL = 300        # seconds
+RESULT_LIST_MAX_ENTRIES = 1000
+
+
+class CursorError(ValueError):
+    """Malformed cursor, or one issued for another query / index generation."""
+
+
+def params_hash(q, category=None, lang=None):
+    raw = json.dumps([" ".join((q or "").split()).lower(), category or "", lang or ""])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(token, offset, generation, phash):
+    raw = json.dumps({"k": token, "o": offset, "g": generation, "p": phash}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(token, offset, generation, params hash); raises CursorError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        token, offset, generation, phash = data["k"], int(data["o"]), data["g"], data["p"]
+    except (ValueError, TypeError, KeyError):
+        raise CursorError("malformed cursor")
+    # the token keys the result cache: anything but a string would not hash
+    if offset < 0 or not isinstance(token, str):
+        raise CursorError("malformed cursor")
+    return token, offset, generation, phash
+
+
+class ResultListCache:
+    """token -> (generation, params hash, [(id, score)]) with TTL and LRU eviction."""
+
+    def __init__(self, ttl=RESULT_LIST_TTL, max_entries=RESULT_LIST_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (expires, generation, phash, ranked)
+        self._lock = threading.Lock()
+
+    def put(self, generation, phash, ranked, token=None):
+        token = token or secrets.token_urlsafe(9)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, generation, phash, ranked)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token):
+        """(generation, params hash, ranked) or None if unknown / expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1:]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,126 @@
+# trie.py
+# Compressed (radix) prefix trie for typeahead. Every node keeps the top-k
+# (score, term) pairs of its subtree, so a suggestion lookup only walks the
+# typed prefix: O(len(prefix)), independent of how many terms are indexed.
+import threading
+
+DEFAULT_TOP_K = 8
+
+
+class _Node:
+    __slots__ = ("edges", "top", "terminal")
+
+    def __init__(self):
+        self.edges = {}     # first char -> [label, child]
+        self.top = []       # [(score, display)] best first, at most k
+        self.terminal = False
+
+
+class SuggestionTrie:
+    """
+    add(term, score) inserts or raises a term's score (scores only grow, which
+    keeps the per-node top-k exact); suggest(prefix) returns the best terms
+    under that prefix. Keys are matched lowercased; display keeps its case.
+    """
+
+    def __init__(self, k=DEFAULT_TOP_K):
+        self.k = k
+        self.root = _Node()
+        self._scores = {}   # display -> score
+        self._keys = {}     # display -> keys it was added under
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, display):
+        return display in self._scores
+
+    def _offer(self, node, score, display):
+        top = node.top
+        if len(top) >= self.k and score <= top[-1][0] and all(d != display for _, d in top):
+            return
+        top = [(s, d) for s, d in top if d != display]
+        top.append((score, display))
+        top.sort(key=lambda x: (-x[0], x[1]))
+        # swap in a new list so lock-free readers never see a half-sorted one
+        node.top = top[:self.k]
+
+    def add(self, key, display=None, score=1.0, increment=False):
+        """
+        Make display reachable under key. A display may sit under several keys
+        (e.g. a title and its suffixes); they all share one score.
+        """
+        display = display or " ".join((key or "").split())
+        key = " ".join((key or "").lower().split())
+        if not key:
+            return
+        with self._lock:
+            old = self._scores.get(display, 0.0)
+            new = old + score if increment else max(old, score)
+            keys = self._keys.setdefault(display, set())
+            if new != old or display not in self._scores:
+                self._scores[display] = new
+                # a raised score has to reach the top-k along every key's path
+                for k in keys:
+                    self._insert(k, display, new)
+            if key not in keys:
+                keys.add(key)
+                self._insert(key, display, new)
+
+    def _insert(self, key, display, score):
+        node = self.root
+        self._offer(node, score, display)
+        rest = key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = [rest, child]
+                self.size += 1
+                node = child
+                rest = ""
+                break
+            label, child = edge
+            # common prefix of label and rest
+            n = 0
+            limit = min(len(label), len(rest))
+            while n < limit and label[n] == rest[n]:
+                n += 1
+            if n < len(label):
+                # split the edge: node -label[:n]-> mid -label[n:]-> child
+                mid = _Node()
+                mid.top = list(child.top)
+                mid.edges[label[n]] = [label[n:], child]
+                edge[0] = label[:n]
+                edge[1] = mid
+                self.size += 1
+                child = mid
+            node = child
+            rest = rest[n:]
+            self._offer(node, score, display)
+        node.terminal = True
+        self._offer(node, score, display)
+
+    def suggest(self, prefix, k=None):
+        raw = (prefix or "").lower()
+        prefix = " ".join(raw.split())
+        # a typed trailing space ends the word: "pm " must not match "pmay"
+        if prefix and raw[-1].isspace():
+            prefix += " "
+        node = self.root
+        rest = prefix
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return []
+            label, child = edge
+            if rest.startswith(label):
+                rest = rest[len(label):]
+            elif label.startswith(rest):
+                rest = ""
+            else:
+                return []
+            node = child
+        return [d for _, d in node.top[:k or self.k]]
@@ -0,0 +1,213 @@
+# metrics.py
+# In-process timers/counters, Prometheus text exposition, Server-Timing
+# stages for the current request and an optional sampling profiler for
+# slow requests. Stdlib only so any module can import it cheaply.
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRIC_PREFIX = "kb"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# requests slower than this (ms) print their sampled stacks; None disables profiling
+PROFILE_SLOW_MS = None
+PROFILE_INTERVAL_MS = 5
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_gauges = {}       # (name, labels) -> value
+_histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+
+# (stage, seconds) pairs recorded during the current request, for Server-Timing
+_request_stages = ContextVar("request_stages", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0) + value
+
+
+def gauge_add(name, value, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _gauges[k] = _gauges.get(k, 0) + value
+
+
+def observe(name, seconds, **labels):
+    k = _key(name, labels)
+    with _lock:
+        h = _histograms.get(k)
+        if h is None:
+            h = _histograms[k] = [0] * (len(BUCKETS) + 2)
+        for i, b in enumerate(BUCKETS):
+            if seconds <= b:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def record_stage(stage, seconds):
+    observe("stage_seconds", seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+def add_stages(stages):
+    """Add stages timed on another thread (already observed there) to the current request's Server-Timing."""
+    current = _request_stages.get()
+    if current is not None:
+        current.extend(stages)
+
+
+@contextmanager
+def timer(stage):
+    """Time a block into kb_stage_seconds{stage=...} and the request's Server-Timing."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - t0)
+
+
+def start_request():
+    """Begin collecting stages for the current request; returns the stage list."""
+    stages = []
+    _request_stages.set(stages)
+    return stages
+
+
+def server_timing(stages, total=None):
+    """Server-Timing header value; repeated stages are summed."""
+    summed = {}
+    for stage, seconds in stages:
+        summed[stage] = summed.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in summed.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _fmt_labels(labels, extra=None):
+    items = list(labels) + (extra or [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+def _fmt_value(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+    lines = []
+
+    def family(kind, items, suffix=""):
+        by_name = {}
+        for (name, labels), value in items.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            full = f"{METRIC_PREFIX}_{name}{suffix}"
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind == "histogram":
+                    for b, count in zip(BUCKETS, value):
+                        lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', b)])} {count}")
+                    lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {value[-1]}")
+                    lines.append(f"{full}_sum{_fmt_labels(labels)} {_fmt_value(value[-2])}")
+                    lines.append(f"{full}_count{_fmt_labels(labels)} {value[-1]}")
+                else:
+                    lines.append(f"{full}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+    family("counter", counters, "_total")
+    family("gauge", gauges)
+    family("histogram", histograms)
+    return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """
+    One background thread sampling the stacks of registered threads every
+    interval_ms. profile() registers the calling thread for the duration of
+    a block and returns the collapsed stack counts gathered meanwhile.
+    """
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self._targets = {}  # thread id -> Counter of collapsed stacks
+        self._targets_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run_loop, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._targets_lock:
+                if not self._targets:
+                    continue
+                frames = sys._current_frames()
+                for tid, samples in self._targets.items():
+                    frame = frames.get(tid)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                        frame = frame.f_back
+                    if stack:
+                        samples[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def profile(self):
+        tid = threading.get_ident()
+        samples = Counter()
+        with self._targets_lock:
+            self._targets[tid] = samples
+        self._ensure_started()
+        try:
+            yield samples
+        finally:
+            with self._targets_lock:
+                self._targets.pop(tid, None)
+
+
+_profiler = SamplingProfiler()
+
+
+@contextmanager
+def profile_if_slow(name, threshold_ms=None):
+    """
+    Sample the current thread while the block runs; if it took longer than
+    threshold_ms (default PROFILE_SLOW_MS) print the hottest stacks.
+    No-op when profiling is disabled.
+    """
+    threshold = PROFILE_SLOW_MS if threshold_ms is None else threshold_ms
+    if threshold is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    with _profiler.profile() as samples:
+        yield
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if elapsed_ms >= threshold:
+        inc("slow_requests", endpoint=name)
+        print(f"[profile] {name} took {elapsed_ms:.1f} ms, {sum(samples.values())} samples")
+        for stack, count in samples.most_common(5):
+            print(f"[profile]   {count:4d} {stack}")
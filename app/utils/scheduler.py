@@ -1,7 +1,6 @@
 import threading
 import time
-from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler  
-from app.src.semantic_using_NLP.semantic import build_embeddings
+from app.utils import metrics
 
 # interval in seconds between automatic refreshes (e.g., 6 hours)
 DEFAULT_INTERVAL = 60 * 60 * 6
@@ -23,16 +22,74 @@ class AutoRefresher:
         self._stop.set()
 
     def _run_loop(self):
+        # heavy imports stay off the app import path
+        from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+        from app.src.semantic_using_NLP.rebuild import get_coordinator
+        from app.src.web_crawler.indexer.indexer import refresh_after_crawl
         while not self._stop.is_set():
             try:
-                crawler = EnhancedCrawler()
-                crawler.crawl(categories=self.categories, keywords=self.keywords, max_pages=self.max_pages)
-                # rebuild semantic embeddings after crawl
-                build_embeddings(force_rebuild=True)
+                with metrics.timer("autorefresh_cycle"):
+                    crawler = EnhancedCrawler()
+                    stored = crawler.crawl(categories=self.categories, keywords=self.keywords, max_pages=self.max_pages)
+                    metrics.inc("autorefresh_pages_stored", len(stored))
+                    if stored:
+                        # rebuild semantic embeddings after crawl (debounced, single-flight)
+                        get_coordinator().request("autorefresh")
+                        refresh_after_crawl()
+                    else:
+                        print("[autorefresh] no new pages, skipping rebuild")
             except Exception as e:
+                metrics.inc("autorefresh_errors")
                 print(f"[autorefresh] error: {e}")
             # wait
             for _ in range(int(self.interval)):
                 if self._stop.is_set():
                     break
                 time.sleep(1)
+
+
+# interval in seconds between index maintenance passes, and the work budget of one pass
+DEFAULT_MAINTENANCE_INTERVAL = 60 * 60
+DEFAULT_MAINTENANCE_BUDGET = 2.0
+
+class IndexMaintainer:
+    """Periodic budgeted index maintenance (see indexer/maintenance.py)."""
+
+    def __init__(self, interval=DEFAULT_MAINTENANCE_INTERVAL, budget_seconds=DEFAULT_MAINTENANCE_BUDGET):
+        self.interval = interval
+        self.budget_seconds = budget_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="index-maintenance", daemon=True)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_loop(self):
+        from app.src.web_crawler.indexer import indexer
+        from app.src.web_crawler.indexer.maintenance import maintenance_lock, run_maintenance
+        while not self._stop.wait(self.interval):
+            try:
+                with metrics.timer("maintenance_cycle"):
+                    with maintenance_lock(indexer.DB_PATH) as held:
+                        if held:
+                            conn = indexer.db_connect()
+                            try:
+                                report = run_maintenance(conn, indexer.DB_PATH, self.budget_seconds)
+                            finally:
+                                conn.close()
+                            if report["deleted"]:
+                                # expired pages must leave the semantic partitions too
+                                from app.src.semantic_using_NLP.rebuild import get_coordinator
+                                get_coordinator().request("maintenance")
+                        else:
+                            # another worker is running this pass
+                            metrics.inc("maintenance_skipped")
+                    # drops expired titles from this worker's suggestions
+                    indexer.SearchIndexer()._build_inverted_index(blocking=False)
+            except Exception as e:
+                metrics.inc("maintenance_errors")
+                print(f"[maintenance] error: {e}")
@@ -0,0 +1,57 @@
+# bench_batching.py
+# Throughput / latency of hybrid_rank with and without micro-batched scoring
+# at several concurrency levels (threads stand in for FastAPI's threadpool).
+# Usage: python -m benchmarks.bench_batching [--pages 20000] [--concurrency 1 4 16 64]
+import argparse
+import random
+import threading
+import time
+from benchmarks.corpus import make_workspace, TOPICS
+from app.src.semantic_using_NLP import semantic
+
+
+def _worker(n_requests, n_pages, seed, latencies):
+    rng = random.Random(seed)
+    words = " ".join(TOPICS.values()).split()
+    for _ in range(n_requests):
+        q = " ".join(rng.sample(words, 2))
+        cands = rng.sample(range(1, n_pages + 1), 100)
+        t0 = time.perf_counter()
+        semantic.hybrid_rank(q, cands, top_k=20)
+        latencies.append(time.perf_counter() - t0)
+
+
+def run_level(concurrency, n_requests, n_pages):
+    latencies = []
+    threads = [threading.Thread(target=_worker, args=(n_requests, n_pages, i, latencies))
+               for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return len(latencies) / elapsed, p50, p95
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=20000)
+    ap.add_argument("--requests", type=int, default=100, help="per thread")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = ap.parse_args()
+    make_workspace(args.pages)
+    semantic.hybrid_rank("warm up", [1, 2, 3])
+    print(f"pages={args.pages} window={semantic.BATCH_WINDOW_MS}ms max_batch={semantic.BATCH_MAX_SIZE}")
+    for batching in (False, True):
+        semantic.BATCH_SCORING = batching
+        for c in args.concurrency:
+            qps, p50, p95 = run_level(c, args.requests, args.pages)
+            print(f"batching={'on ' if batching else 'off'} concurrency={c:<3d} "
+                  f"{qps:8.1f} q/s  p50={p50:7.2f} ms  p95={p95:7.2f} ms")
+    b = semantic._batcher
+    if b and b.batches:
+        print(f"avg batch size {b.items / b.batches:.1f}")
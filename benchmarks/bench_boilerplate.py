@@ -0,0 +1,88 @@
+# bench_boilerplate.py
+# Stored bytes / FTS index size / TF-IDF vocabulary per page with and without
+# per-host boilerplate removal, on synthetic portal pages that share a
+# template (banners, menus as <p>, disclaimer, "last updated" lines).
+# Usage: python -m benchmarks.bench_boilerplate [--hosts 20] [--pages-per-host 100]
+import argparse
+import os
+import random
+import shutil
+import time
+from benchmarks.corpus import make_workspace, TOPICS, FILLER
+from app.src.web_crawler.indexer import indexer
+from app.src.semantic_using_NLP import semantic
+from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+
+TEMPLATE_WORDS = ("ministry department government portal official website content owned maintained updated "
+                  "national informatics centre copyright policy disclaimer accessibility help feedback sitemap "
+                  "screen reader access skip main contact us terms conditions hyperlinking privacy").split()
+
+
+def _template(rng):
+    menu = [" ".join(rng.sample(TEMPLATE_WORDS, 2)).title() for _ in range(12)]
+    fixed = [" ".join(rng.choice(TEMPLATE_WORDS) for _ in range(rng.randint(20, 60))) for _ in range(4)]
+    return menu, fixed
+
+
+def _page(rng, menu, fixed, topic):
+    vocab = TOPICS[topic].split()
+    body = [" ".join(rng.choice(vocab if rng.random() < 0.6 else FILLER) for _ in range(rng.randint(30, 90)))
+            for _ in range(rng.randint(4, 12))]
+    ps = menu + fixed[:2] + body + fixed[2:] + [
+        f"Last updated: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        f"Visitor count: {rng.randint(10000, 999999)}",
+    ]
+    return "<html><head><title>{}</title></head><body><main><h1>{}</h1>{}</main></body></html>".format(
+        topic, " ".join(rng.sample(vocab, 3)), "".join(f"<p>{p}</p>" for p in ps))
+
+
+def _measure(db_path, rows):
+    indexer.DB_PATH = db_path
+    indexer.init_db()
+    conn = indexer.db_connect()
+    conn.executemany("INSERT INTO pages (url, title, summary, content, category, language, content_hash) "
+                     "VALUES (?, ?, ?, ?, ?, 'english', ?)", [r + (str(i),) for i, r in enumerate(rows)])
+    conn.commit()
+    fts = conn.execute("SELECT SUM(LENGTH(block)) FROM pages_fts_data").fetchone()[0]
+    content = conn.execute("SELECT SUM(LENGTH(content)) FROM pages").fetchone()[0]
+    conn.close()
+    vectorizer = semantic._make_vectorizer("english")
+    matrix = vectorizer.fit_transform([r[3] for r in rows])
+    return content / len(rows), fts / len(rows), len(vectorizer.vocabulary_), matrix.nnz / len(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hosts", type=int, default=20)
+    ap.add_argument("--pages-per-host", type=int, default=100)
+    args = ap.parse_args()
+    workdir = make_workspace(0, build=False)
+    try:
+        rng = random.Random(0)
+        crawler = EnhancedCrawler()
+        raw_rows, clean_rows = [], []
+        clean_secs = raw_secs = 0.0
+        for h in range(args.hosts):
+            menu, fixed = _template(rng)
+            for i in range(args.pages_per_host):
+                topic = rng.choice(list(TOPICS))
+                url = f"https://portal{h}.example.gov.in/page/{i}"
+                html = _page(rng, menu, fixed, topic)
+                t0 = time.perf_counter()
+                title, summary, content = crawler._clean_text(html)
+                raw_secs += time.perf_counter() - t0
+                raw_rows.append((url, title, summary, content, topic))
+                t0 = time.perf_counter()
+                title, summary, content = crawler._clean_text(html, url)
+                clean_secs += time.perf_counter() - t0
+                clean_rows.append((url, title, summary, content, topic))
+        n = len(raw_rows)
+        raw = _measure(os.path.join(workdir, "raw.db"), raw_rows)
+        clean = _measure(os.path.join(workdir, "clean.db"), clean_rows)
+        print(f"{n} pages on {args.hosts} hosts; clean_text {raw_secs / n * 1000:.2f} ms -> "
+              f"{clean_secs / n * 1000:.2f} ms per page with boilerplate removal")
+        for label, a, b in [("content bytes/page", raw[0], clean[0]), ("fts bytes/page", raw[1], clean[1]),
+                            ("tf-idf vocabulary", raw[2], clean[2]), ("tf-idf nnz/page", raw[3], clean[3])]:
+            print(f"{label:<20} {a:>10.0f} -> {b:>10.0f}  ({(b - a) / a * 100:+.1f}%)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,79 @@
+# bench_classifier.py
+# Per-page cost of TextClassifier.tag() vs the original keyword scans.
+# Usage: python -m benchmarks.bench_classifier [--db storage.db] [--repeat 20]
+import argparse
+import sqlite3
+import time
+from app.src.web_crawler.crawler_spider.classifier import TextClassifier
+
+
+def legacy_detect_language(text: str):
+    hindi_keywords = ['की','के','है','में','यह','और','नए','किसान']
+    if any(k in text for k in hindi_keywords):
+        return "hindi"
+    return "english"
+
+
+def legacy_guess_category(url: str, text: str):
+    urll = url.lower() + (text or "").lower()
+    health_k = ['health','hospital','mohfw','vaccine','covid','corona','coronavirus']
+    agri_k = ['agri','farm','krishi','कृषि','pmkisan','farmer']
+    edu_k = ['education','school','ugc','ncert','student','college']
+    if any(k in urll for k in health_k):
+        return "health"
+    if any(k in urll for k in agri_k):
+        return "agriculture"
+    if any(k in urll for k in edu_k):
+        return "education"
+    return "government"
+
+
+def load_pages(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT url, content FROM pages").fetchall()
+    conn.close()
+    return [(u or "", c or "") for u, c in rows]
+
+
+def synthetic_pages(n=50, size=30000):
+    en = "the scheme provides support to every district office and citizen service centre "
+    hi = "किसान सम्मान निधि योजना के लिए आवेदन करें और लाभ प्राप्त करें "
+    pages = []
+    for i in range(n):
+        chunk = en if i % 2 else hi
+        pages.append((f"https://site{i}.gov.in/page", (chunk * (size // len(chunk) + 1))[:size]))
+    return pages
+
+
+def run(pages, repeat):
+    clf = TextClassifier()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for url, text in pages:
+            legacy_guess_category(url, text)
+            legacy_detect_language(text)
+    legacy = (time.perf_counter() - t0) / (repeat * len(pages))
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for url, text in pages:
+            clf.tag(text, url)
+    single = (time.perf_counter() - t0) / (repeat * len(pages))
+    changed = sum(
+        1 for url, text in pages
+        if clf.tag(text, url) != (legacy_guess_category(url, text), legacy_detect_language(text))
+    )
+    avg_len = sum(len(t) for _, t in pages) / max(1, len(pages))
+    print(f"pages={len(pages)} avg_chars={avg_len:.0f}")
+    print(f"legacy  per page: {legacy * 1e6:9.1f} us")
+    print(f"single  per page: {single * 1e6:9.1f} us  (x{single / legacy if legacy else 0:.2f})")
+    print(f"labels differing from legacy: {changed}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="storage.db")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--synthetic", action="store_true", help="use generated 30k-char pages")
+    args = ap.parse_args()
+    pages = synthetic_pages() if args.synthetic else load_pages(args.db)
+    run(pages, args.repeat)
@@ -0,0 +1,101 @@
+# bench_crawl.py
+# End-to-end crawl throughput against the offline replay server
+# (benchmarks/replay_server.py, run as a separate process so its CPU is not
+# counted): pages/sec, crawler CPU per page, bytes read, per-stage time and
+# store throughput. Politeness delays are off; --latency-ms stands in for
+# the network.
+# Usage: python -m benchmarks.bench_crawl [--max-pages 300] [--latency-ms 20]
+#        [--failure-rate 0.02] [--corpus recorded.jsonl.gz] [--categories health ...]
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from benchmarks.corpus import make_workspace
+from benchmarks.replay_server import load_corpus, save_corpus, synthetic_corpus
+from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+from app.utils import metrics
+
+_LINE_RE = re.compile(r'^kb_(\w+?)(?:\{(.*)\})? (\S+)$')
+
+
+def _metrics():
+    """{(name, labels string): value} from the Prometheus exposition."""
+    out = {}
+    for line in metrics.render_prometheus().splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out[(m.group(1), m.group(2) or "")] = float(m.group(3))
+    return out
+
+
+def _start_server(corpus_path, latency_ms, failure_rate, failure_status):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.replay_server", "serve", "--corpus", corpus_path,
+         "--latency-ms", str(latency_ms), "--failure-rate", str(failure_rate),
+         "--failure-status", str(failure_status)],
+        stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on"):
+        proc.kill()
+        raise RuntimeError(f"replay server did not start: {line!r}")
+    return proc, line.split()[-1]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-pages", type=int, default=300)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--failure-rate", type=float, default=0.02)
+    ap.add_argument("--failure-status", type=int, default=503)
+    ap.add_argument("--corpus", help="recorded corpus (replay_server record); synthetic if omitted")
+    ap.add_argument("--hosts", type=int, default=20)
+    ap.add_argument("--pages-per-host", type=int, default=50)
+    ap.add_argument("--categories", nargs="*")
+    args = ap.parse_args()
+
+    workdir = make_workspace(0, build=False)
+    corpus_path = args.corpus
+    if not corpus_path:
+        corpus_path = os.path.join(workdir, "replay.jsonl.gz")
+        save_corpus(corpus_path, *synthetic_corpus(args.hosts, args.pages_per_host))
+    seeds, corpus = load_corpus(corpus_path)
+    proc, address = _start_server(corpus_path, args.latency_ms, args.failure_rate, args.failure_status)
+    try:
+        # replay hosts end in .gov.in, so the default trusted suffixes apply
+        crawler = EnhancedCrawler(politeness=0, max_pages=args.max_pages, seeds=seeds)
+        # every http request goes to the replay server, which answers by absolute url
+        crawler.session.trust_env = False
+        crawler.session.proxies = {"http": f"http://{address}"}
+        before = _metrics()
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        stored = crawler.crawl(categories=args.categories)
+        wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+        after = _metrics()
+    finally:
+        proc.kill()
+        proc.wait()
+
+    def delta(name, labels=""):
+        return after.get((name, labels), 0.0) - before.get((name, labels), 0.0)
+
+    results = {labels.split('"')[1]: delta(name, labels) for name, labels in after
+               if name == "crawl_pages_total"}
+    fetched = sum(results.values())
+    print(f"corpus: {len(corpus)} urls, latency {args.latency_ms:.0f} ms, failure rate {args.failure_rate:.0%}")
+    print(f"crawl:  {len(stored)} stored / {fetched:.0f} fetched in {wall:.2f}s "
+          f"-> {len(stored) / wall:.1f} stored pages/s, {fetched / wall:.1f} fetches/s")
+    print(f"cpu:    {cpu:.2f}s crawler process, {cpu / max(fetched, 1) * 1000:.1f} ms per fetched page")
+    print(f"bytes:  {delta('crawl_bytes_read_total') / 1e6:.1f} MB read, "
+          f"{delta('crawl_bytes_saved_total') / 1e6:.1f} MB skipped on headers")
+    for stage in ("crawl_fetch", "crawl_parse", "crawl_store"):
+        labels = f'stage="{stage}"'
+        secs, n = delta("stage_seconds_sum", labels), delta("stage_seconds_count", labels)
+        print(f"  {stage:12s} {secs:7.2f}s  {secs / max(n, 1) * 1000:7.2f} ms avg  ({n:.0f} calls)")
+    store_secs = delta("stage_seconds_sum", 'stage="crawl_store"')
+    print(f"store:  {len(stored) / max(store_secs, 1e-9):.0f} pages/s")
+    print("results:", ", ".join(f"{k} {v:.0f}" for k, v in sorted(results.items())))
+    rejected = {labels.split('"')[1]: delta(name, labels) for name, labels in after if name == "crawl_rejected_total"}
+    if rejected:
+        print("rejected:", ", ".join(f"{k} {v:.0f}" for k, v in sorted(rejected.items())))
@@ -0,0 +1,87 @@
+# bench_dense.py
+# Recall@k and latency of the IVF index vs brute force. The default mode fits
+# the real pipeline (the app's TF-IDF vectorizer, dense.fit_lsa, dense.build_ivf)
+# on synthetic pages and queries them with projected TF-IDF query rows;
+# --mode gaussian uses unit vectors drawn around topic directions instead.
+# Usage: python -m benchmarks.bench_dense [--mode lsa|gaussian] [--docs 100000]
+#        [--dim 128] [--queries 200]
+import argparse
+import random
+import time
+import numpy as np
+from benchmarks.corpus import FILLER, HINDI_WORDS, TOPICS, synthetic_pages
+from app.src.semantic_using_NLP import dense
+
+
+def gaussian_vectors(n, dim, n_queries, topics=500, seed=0):
+    """(docs, queries): unit vectors drawn around `topics` directions, plus noisy copies of some."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=n)
+    x = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors = dense._normalize(x).astype(np.float32)
+    queries = dense._normalize(
+        vectors[rng.integers(0, n, size=n_queries)]
+        + 0.3 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    ).astype(np.float32)
+    return vectors, queries
+
+
+def lsa_vectors(n, dim, n_queries, seed=0):
+    """(docs, queries) from fit_lsa on the TF-IDF of n synthetic pages, like build_partition."""
+    from app.src.semantic_using_NLP.semantic import _make_vectorizer
+    texts = [" ".join((title, summary, content)) for _, title, summary, content, _, _ in synthetic_pages(n, seed)]
+    vectorizer = _make_vectorizer("english")
+    t0 = time.perf_counter()
+    matrix = vectorizer.fit_transform(texts)
+    print(f"tfidf: {matrix.shape[0]} docs x {matrix.shape[1]} terms in {time.perf_counter() - t0:.1f}s")
+    t0 = time.perf_counter()
+    projection, vectors = dense.fit_lsa(matrix, dim=dim)
+    print(f"lsa:   {vectors.shape[1]} dims in {time.perf_counter() - t0:.1f}s")
+    # queries of 2-4 words, mostly from one topic, like the search box sees
+    rng = random.Random(seed + 1)
+    words = [w for topic in TOPICS.values() for w in topic.split()]
+    queries = []
+    for _ in range(n_queries):
+        vocab = TOPICS[rng.choice(list(TOPICS))].split()
+        q = [rng.choice(vocab) for _ in range(rng.randint(2, 4))]
+        if rng.random() < 0.3:
+            q.append(rng.choice(words + HINDI_WORDS + FILLER))
+        queries.append(" ".join(q))
+    return vectors, dense.project_queries(projection, vectorizer.transform(queries))
+
+
+def run(vectors, queries, top_k, nprobes):
+    n_docs, dim = vectors.shape
+    t0 = time.perf_counter()
+    index = dense.build_ivf(vectors, nlist=int(4 * np.sqrt(n_docs)))
+    print(f"docs={n_docs} dim={dim} nlist={index['centroids'].shape[0]} "
+          f"build={time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    truth = [set(dense.search_exact(vectors, q, top_k)[0].tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+    print(f"brute force       {exact_ms:8.3f} ms/query  recall@{top_k}=1.000")
+
+    for nprobe in nprobes:
+        t0 = time.perf_counter()
+        hits = 0
+        for q, expected in zip(queries, truth):
+            rows, _ = dense.search_ivf(index, q, top_k=top_k, nprobe=nprobe)
+            hits += len(expected & set(rows.tolist()))
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        print(f"ivf nprobe={nprobe:<5d} {ms:8.3f} ms/query  recall@{top_k}={hits / (top_k * len(queries)):.3f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=["lsa", "gaussian"], default="lsa")
+    ap.add_argument("--docs", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=dense.DENSE_DIM)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = ap.parse_args()
+    build = lsa_vectors if args.mode == "lsa" else gaussian_vectors
+    vectors, queries = build(args.docs, args.dim, args.queries)
+    run(vectors, queries, args.top_k, args.nprobe)
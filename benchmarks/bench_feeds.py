@@ -0,0 +1,73 @@
+# bench_feeds.py
+# Materialized feeds: cost of the post-crawl refresh (all users dirty, then
+# only users touched by new pages) and /feed read latency vs computing the
+# feed on the request.
+# Usage: python -m benchmarks.bench_feeds [--pages 20000] [--users 5000]
+import argparse
+import random
+import shutil
+import time
+from benchmarks.corpus import make_workspace, synthetic_pages, TOPICS
+from app.src.web_crawler.indexer import indexer, feeds
+
+
+def _add_pages(n, seed, categories):
+    pages = [p for p in synthetic_pages(n * len(TOPICS), seed) if p[4] in categories][:n]
+    conn = indexer.db_connect()
+    conn.executemany(
+        "INSERT INTO pages (url, title, summary, content, category, language, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(p[0] + f"?r={seed}",) + p[1:] + (f"{seed}-{i}",) for i, p in enumerate(pages)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=20000)
+    ap.add_argument("--users", type=int, default=5000)
+    ap.add_argument("--reads", type=int, default=2000)
+    args = ap.parse_args()
+    workdir = make_workspace(args.pages, build=False)
+    try:
+        rng = random.Random(0)
+        cats = list(TOPICS)
+        conn = indexer.db_connect()
+        cur = conn.cursor()
+        for u in range(args.users):
+            # most users stick to one topic
+            cat = cats[u % len(cats)]
+            for _ in range(3):
+                q = " ".join(rng.sample(TOPICS[cat].split(), 2))
+                feeds.record_search(cur, f"user{u}", q, cat)
+        conn.commit()
+
+        (rebuilt, _), secs = _timed(feeds.refresh_feeds, conn)
+        print(f"initial refresh: {rebuilt} feeds in {secs:.2f}s ({secs / max(rebuilt, 1) * 1000:.2f} ms/feed)")
+        (rebuilt, skipped), secs = _timed(feeds.refresh_feeds, conn)
+        print(f"no new pages: rebuilt={rebuilt} skipped={skipped} in {secs * 1000:.1f} ms")
+        _add_pages(200, seed=1, categories={"health"})
+        (rebuilt, skipped), secs = _timed(feeds.refresh_feeds, conn)
+        print(f"200 new health pages: rebuilt={rebuilt} skipped={skipped} in {secs:.2f}s")
+
+        users = [f"user{rng.randrange(args.users)}" for _ in range(args.reads)]
+        engine = indexer.RuralSearchEngine()
+        t0 = time.perf_counter()
+        for u in users:
+            engine.get_personalized_feed(u, limit=10)
+        read_ms = (time.perf_counter() - t0) / len(users) * 1000
+        t0 = time.perf_counter()
+        for u in users[:200]:
+            feeds.build_feed(cur, u)
+        build_ms = (time.perf_counter() - t0) / 200 * 1000
+        conn.rollback()
+        conn.close()
+        print(f"/feed read {read_ms:.3f} ms/request vs computing it {build_ms:.2f} ms/request")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
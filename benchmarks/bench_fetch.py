@@ -0,0 +1,111 @@
+# bench_fetch.py
+# Bytes pulled and peak memory for a mix of links (HTML, PDFs and archives
+# that pass the extension filter, oversized HTML with and without
+# Content-Length, non-UTF-8 pages) served locally: a full resp.text read
+# (the old fetch) vs EnhancedCrawler._fetch streaming with header rejection.
+# Usage: python -m benchmarks.bench_fetch [--rounds 5]
+import argparse
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from app.src.web_crawler.crawler_spider import crawler as crawler_mod
+from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+from app.utils import metrics
+
+HTML = ("<html><head><meta charset='utf-8'><title>t</title></head><body>"
+        + "<p>किसान योजना scheme details for farmers</p>" * 200 + "</body></html>").encode("utf-8")
+LATIN1 = ("<html><head><meta http-equiv='Content-Type' content='text/html; charset=iso-8859-1'></head>"
+          "<body><p>Café naïve résumé</p></body></html>").encode("latin-1")
+BIG = b"<html><body>" + b"<p>" + b"x" * 1000 + b"</p>" * 1 + b"<p>filler paragraph</p>" * 400_000 + b"</body></html>"
+PDF = b"%PDF-1.4\n" + b"\0" * 8_000_000
+
+# path -> (content type, body, send Content-Length)
+ROUTES = {
+    "/page.html": ("text/html; charset=utf-8", HTML, True),
+    "/latin1": ("text/html", LATIN1, True),
+    "/download?id=1": ("application/pdf", PDF, True),
+    "/file": ("application/octet-stream", PDF, False),
+    "/huge.html": ("text/html", BIG, True),
+    "/huge-chunked": ("text/html", BIG, False),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        ctype, body, with_length = ROUTES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        if with_length:
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for i in range(0, len(body), 65536):
+                self.wfile.write(body[i:i + 65536])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        if not with_length:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def _old_fetch(session, url):
+    resp = session.get(url, timeout=30)
+    if "text/html" not in resp.headers.get("content-type", ""):
+        return None, len(resp.content)
+    return resp.text, len(resp.content)
+
+
+def _run(fn, urls, rounds):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for u in urls:
+            fn(u)
+    secs = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return secs, peak
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [base + p for p in ROUTES]
+    try:
+        old_bytes = [0]
+        session = requests.Session()
+
+        def old(u):
+            old_bytes[0] += _old_fetch(session, u)[1]
+
+        secs, peak = _run(old, urls, args.rounds)
+        print(f"full read:  {old_bytes[0] / 1e6:8.1f} MB read  {secs:6.2f}s  peak {peak / 1e6:6.1f} MB")
+
+        c = EnhancedCrawler()
+        secs, peak = _run(c._fetch, urls, args.rounds)
+        counters = {}
+        for line in metrics.render_prometheus().splitlines():
+            if line.startswith(("kb_crawl_bytes", "kb_crawl_rejected", "kb_crawl_truncated")):
+                name, value = line.rsplit(" ", 1)
+                counters[name] = float(value)
+        print(f"streaming:  {counters.get('kb_crawl_bytes_read_total', 0) / 1e6:8.1f} MB read  {secs:6.2f}s  "
+              f"peak {peak / 1e6:6.1f} MB  (cap {crawler_mod.MAX_PAGE_BYTES / 1e6:.1f} MB/page)")
+        for name, value in sorted(counters.items()):
+            print(f"  {name} {value:.0f}")
+        latin = c._fetch(base + "/latin1")
+        print("charset check:", "Café" in latin and "résumé" in latin,
+              "किसान" in c._fetch(base + "/page.html"))
+    finally:
+        server.shutdown()
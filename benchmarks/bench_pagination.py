@@ -0,0 +1,49 @@
+# bench_pagination.py
+# Deep paging: fetching page n by re-running search with limit = n * size
+# (the only option before cursors) vs following X-Next-Cursor.
+# Usage: python -m benchmarks.bench_pagination [--pages 20000] [--size 10] [--depth 10]
+import argparse
+import random
+import shutil
+import time
+from benchmarks.corpus import make_workspace, TOPICS
+from app.src.web_crawler.indexer import indexer
+
+
+def _ms(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=20000)
+    ap.add_argument("--size", type=int, default=10, help="results per page")
+    ap.add_argument("--depth", type=int, default=10, help="pages to walk per query")
+    ap.add_argument("--queries", type=int, default=30)
+    args = ap.parse_args()
+    workdir = make_workspace(args.pages)
+    try:
+        rng = random.Random(0)
+        words = " ".join(TOPICS.values()).split()
+        queries = [rng.choice(words) for _ in range(args.queries)]
+        indexer.search_pages("warm up", limit=1)
+        relimit = [0.0] * args.depth
+        cursor_ms = [0.0] * args.depth
+        for q in queries:
+            for n in range(args.depth):
+                _, ms = _ms(indexer.search_pages, q, limit=(n + 1) * args.size)
+                relimit[n] += ms
+            cursor = None
+            for n in range(args.depth):
+                (_, cursor), ms = _ms(indexer.search_pages_cursor, q, limit=args.size, cursor=cursor)
+                cursor_ms[n] += ms
+                if cursor is None:
+                    break
+        print(f"{'page':>4}  {'re-run with larger limit':>24}  {'cursor':>10}")
+        for n in range(args.depth):
+            print(f"{n + 1:>4}  {relimit[n] / len(queries):>21.2f} ms  {cursor_ms[n] / len(queries):>7.2f} ms")
+        print(f"walk of {args.depth} pages: {sum(relimit) / len(queries):.1f} ms vs {sum(cursor_ms) / len(queries):.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
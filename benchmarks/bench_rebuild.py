@@ -0,0 +1,91 @@
+# bench_rebuild.py
+# Embedding rebuild cost under a burst of crawls: one refit per crawl (the
+# old BackgroundTask behaviour) vs the debounced single-flight coordinator,
+# the fingerprint skip when nothing changed, and several worker processes
+# starting against an empty embeddings dir at once.
+# Usage: python -m benchmarks.bench_rebuild [--pages 5000] [--crawls 10]
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from benchmarks.corpus import make_workspace, synthetic_pages
+from app.src.web_crawler.indexer import indexer
+from app.src.semantic_using_NLP import semantic, rebuild
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _crawl(n, seed):
+    """Stand-in for a crawl storing n new pages."""
+    conn = indexer.db_connect()
+    conn.executemany(
+        "INSERT INTO pages (url, title, summary, content, category, language, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(p[0] + f"?r={seed}",) + p[1:] + (f"{seed}-{i}",) for i, p in enumerate(synthetic_pages(n, seed))],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system
+
+
+def _workers(n, workdir):
+    code = (
+        "import sys; from app.src.web_crawler.indexer import indexer; "
+        "from app.src.semantic_using_NLP import semantic, rebuild; "
+        f"indexer.DB_PATH = {os.path.join(workdir, 'storage.db')!r}; "
+        f"semantic.EMBED_DIR = {os.path.join(workdir, 'embeddings')!r}; "
+        "rebuild.get_coordinator().build_now(reason='startup')"
+    )
+    t0 = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.DEVNULL) for _ in range(n)]
+    for p in procs:
+        p.wait()
+    return time.perf_counter() - t0
+
+
+def _generations(workdir):
+    root = os.path.join(workdir, "embeddings")
+    return sum(len([g for g in os.listdir(os.path.join(root, k)) if g.startswith("g")])
+               for k in os.listdir(root) if os.path.isdir(os.path.join(root, k)))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=5000)
+    ap.add_argument("--crawls", type=int, default=10)
+    ap.add_argument("--per-crawl", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+    workdir = make_workspace(args.pages)
+    try:
+        cpu0, t0 = _cpu(), time.perf_counter()
+        for i in range(args.crawls):
+            _crawl(args.per_crawl, seed=100 + i)
+            semantic.build_embeddings(force_rebuild=True)
+        print(f"refit per crawl:   {args.crawls} builds, {time.perf_counter() - t0:.2f}s wall, {_cpu() - cpu0:.2f}s cpu")
+
+        coord = rebuild.RebuildCoordinator(debounce=0.5, max_delay=5.0)
+        cpu0, t0 = _cpu(), time.perf_counter()
+        for i in range(args.crawls):
+            _crawl(args.per_crawl, seed=200 + i)
+            coord.request("crawl")
+            time.sleep(0.05)
+        coord.wait_idle()
+        print(f"coordinator:       {coord.builds} build(s) for {coord.requests} requests, "
+              f"{time.perf_counter() - t0:.2f}s wall, {_cpu() - cpu0:.2f}s cpu")
+
+        t0 = time.perf_counter()
+        coord.build_now(force_rebuild=True, reason="unchanged")
+        print(f"unchanged pages:   forced rebuild took {time.perf_counter() - t0:.3f}s (fingerprint skip)")
+
+        shutil.rmtree(os.path.join(workdir, "embeddings"))
+        secs = _workers(args.workers, workdir)
+        print(f"{args.workers} cold workers:    {secs:.2f}s, {_generations(workdir)} generation(s) written "
+              f"for {len(semantic.list_partitions())} partitions")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,105 @@
+# bench_startup.py
+# Cold-start budget: import time of app.main, time until uvicorn accepts
+# /health, and time until /ready reports warm search (with and without a
+# prebuilt embeddings dir). Exits non-zero when a budget is exceeded.
+# Usage: python -m benchmarks.bench_startup [--pages 5000]
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from benchmarks.corpus import make_workspace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# seconds
+IMPORT_BUDGET = 1.0
+ACCEPT_BUDGET = 2.0
+READY_BUDGET_WARM = 5.0   # embeddings already on disk
+HEAVY_MODULES = ["sklearn", "scipy", "numpy", "bs4", "requests", "joblib"]
+
+
+def measure_import():
+    code = (
+        "import json, sys, time; t = time.perf_counter(); import app.main; "
+        "print(json.dumps([time.perf_counter() - t, "
+        f"[m for m in {HEAVY_MODULES!r} if m in sys.modules]]))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, heavy = json.loads(out.stdout.strip().splitlines()[-1])
+    return seconds, heavy
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def measure_server(workdir, timeout=600):
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, KB_AUTOREFRESH="0")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        deadline = t0 + timeout
+        accept = time.perf_counter() - t0 if _wait_for(base + "/health", deadline) else None
+        ready = time.perf_counter() - t0 if _wait_for(base + "/ready", deadline) else None
+        return accept, ready
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def check(label, value, budget):
+    ok = value is not None and (budget is None or value <= budget)
+    shown = "timeout" if value is None else f"{value:.2f}s"
+    limit = f"(budget {budget:.1f}s)" if budget is not None else ""
+    print(f"{label:<34} {shown:>9} {limit} {'OK' if ok else 'OVER'}")
+    return ok
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=5000)
+    args = ap.parse_args()
+
+    ok = True
+    seconds, heavy = measure_import()
+    ok &= check("import app.main", seconds, IMPORT_BUDGET)
+    if heavy:
+        print(f"  heavy modules imported eagerly: {', '.join(heavy)}")
+        ok = False
+
+    workdir = make_workspace(args.pages, build=False)
+    try:
+        accept, ready = measure_server(workdir)
+        ok &= check(f"cold: accept /health ({args.pages} pages)", accept, ACCEPT_BUDGET)
+        check("cold: /ready incl. full build", ready, None)
+        accept, ready = measure_server(workdir)
+        ok &= check("warm: accept /health", accept, ACCEPT_BUDGET)
+        ok &= check("warm: /ready (embeddings on disk)", ready, READY_BUDGET_WARM)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,57 @@
+# bench_suggest.py
+# Typeahead: full and incremental build time of the suggestion trie and
+# per-keystroke suggest() latency (every prefix of sampled titles).
+# Usage: python -m benchmarks.bench_suggest [--pages 50000]
+import argparse
+import random
+import shutil
+import time
+from benchmarks.corpus import make_workspace, synthetic_pages
+from app.src.web_crawler.indexer import indexer
+
+KEYSTROKE_BUDGET_MS = 1.0  # p99
+
+
+def _add_pages(n, seed):
+    conn = indexer.db_connect()
+    conn.executemany(
+        "INSERT INTO pages (url, title, summary, content, category, language, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(p[0] + f"?r={seed}",) + p[1:] + (f"{seed}-{i}",) for i, p in enumerate(synthetic_pages(n, seed))],
+    )
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=50000)
+    ap.add_argument("--new-pages", type=int, default=1000)
+    ap.add_argument("--titles", type=int, default=2000)
+    args = ap.parse_args()
+    workdir = make_workspace(args.pages, build=False)
+    try:
+        engine = indexer.RuralSearchEngine()
+        t0 = time.perf_counter()
+        engine.indexer._build_inverted_index()
+        print(f"full build: {args.pages} pages in {time.perf_counter() - t0:.2f}s "
+              f"({len(engine.indexer.trie)} terms, {engine.indexer.trie.size} nodes)")
+        _add_pages(args.new_pages, seed=1)
+        t0 = time.perf_counter()
+        n = engine.indexer._build_inverted_index()
+        print(f"incremental: {n} new pages in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        rng = random.Random(0)
+        titles = [p[1] for p in rng.sample(synthetic_pages(args.pages), args.titles)]
+        latencies = []
+        for title in titles:
+            for i in range(1, len(title) + 1):
+                t0 = time.perf_counter()
+                engine.get_search_suggestions(title[:i])
+                latencies.append(time.perf_counter() - t0)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"suggest: {len(latencies)} keystrokes p50={p50:.3f} ms p99={p99:.3f} ms "
+              f"max={latencies[-1] * 1000:.3f} ms (budget p99 {KEYSTROKE_BUDGET_MS} ms)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
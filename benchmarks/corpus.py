@@ -0,0 +1,62 @@
+# corpus.py
+# Synthetic pages + a throwaway storage.db / embeddings dir for the benchmarks.
+import os
+import random
+import tempfile
+
+TOPICS = {
+    "agriculture": "farmer crop kisan seed fertilizer irrigation soil harvest mandi price subsidy tractor monsoon",
+    "health": "hospital vaccine doctor clinic medicine ayushman insurance maternal child nutrition disease",
+    "education": "school student scholarship exam college university teacher admission result board syllabus",
+    "government": "scheme portal certificate aadhaar ration pension panchayat application office district citizen",
+}
+HINDI_WORDS = "किसान योजना सरकार आवेदन लाभ स्वास्थ्य शिक्षा विद्यालय छात्र पेंशन प्रमाण पत्र".split()
+FILLER = "the of and to in for on with by from at is are this that information details latest".split()
+
+
+def synthetic_pages(n, seed=0, words_per_page=300):
+    """[(url, title, summary, content, category, language)] with topic-skewed vocab."""
+    rng = random.Random(seed)
+    cats = list(TOPICS)
+    pages = []
+    for i in range(n):
+        cat = cats[i % len(cats)]
+        hindi = i % 5 == 0
+        vocab = TOPICS[cat].split()
+        words = []
+        for _ in range(words_per_page):
+            r = rng.random()
+            if hindi and r < 0.6:
+                words.append(rng.choice(HINDI_WORDS))
+            elif r < 0.7:
+                words.append(rng.choice(vocab))
+            else:
+                words.append(rng.choice(FILLER))
+        content = " ".join(words)
+        title = f"{cat} {' '.join(rng.sample(vocab, 3))} {i}"
+        pages.append((f"http://{cat}{i % 50}.example.gov.in/page/{i}", title, content[:200],
+                      content, cat, "hindi" if hindi else "english"))
+    return pages
+
+
+def make_workspace(n_pages, seed=0, build=True):
+    """
+    Point the app at a fresh temp DB (and embeddings dir) filled with
+    n_pages synthetic pages. Returns the temp directory path.
+    """
+    from app.src.web_crawler.indexer import indexer
+    from app.src.semantic_using_NLP import semantic
+    workdir = tempfile.mkdtemp(prefix="kb-bench-")
+    indexer.DB_PATH = os.path.join(workdir, "storage.db")
+    semantic.EMBED_DIR = os.path.join(workdir, "embeddings")
+    indexer.init_db()
+    conn = indexer.db_connect()
+    conn.executemany(
+        "INSERT INTO pages (url, title, summary, content, category, language, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [p + (str(i),) for i, p in enumerate(synthetic_pages(n_pages, seed))],
+    )
+    conn.commit()
+    conn.close()
+    if build:
+        semantic.build_embeddings(force_rebuild=True)
+    return workdir
@@ -0,0 +1,249 @@
+# replay_server.py
+# Offline stand-in for the seed portals. A corpus (url -> response) is
+# served through a plain HTTP forward proxy, so the crawler keeps its real
+# urls, host filter and link handling while nothing leaves the machine.
+# Latency, injected failures and redirects are configurable.
+#
+# A corpus is gzipped JSON lines: one header {"seeds": {category: [urls]}},
+# then {"url", "status", "content_type", "body"[, "location"]} per url.
+# Urls are matched without their scheme (https pages are replayed over
+# http, with absolute https:// links rewritten to http://).
+#
+# Usage:
+#   python -m benchmarks.replay_server synth --out corpus.jsonl.gz [--hosts 20 --pages-per-host 50]
+#   python -m benchmarks.replay_server record --out corpus.jsonl.gz [--categories health --max-pages 100]
+#   python -m benchmarks.replay_server serve --corpus corpus.jsonl.gz [--port 0 --latency-ms 20 --failure-rate 0.02]
+import argparse
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from benchmarks.corpus import FILLER, HINDI_WORDS, TOPICS
+
+REPLAY_SUFFIX = ".replay.gov.in"   # passes the crawler's TRUSTED_SUFFIXES
+TEMPLATE_BLOCKS = [
+    "Content on this website is published and managed by the department. For any query please contact the web information manager.",
+    "Disclaimer: the information on this portal is for reference only and does not constitute a legal document.",
+    "Last updated on 12/03/2024 | Visitors 1234567 | Best viewed in 1024x768 resolution.",
+]
+
+
+def _url_key(url):
+    parts = urlsplit(url)
+    return (parts.hostname or "") + (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+
+def _page_html(rng, host, title, cat, links, words):
+    vocab = TOPICS[cat].split()
+    paras = []
+    for _ in range(max(1, words // 60)):
+        ws = [rng.choice(HINDI_WORDS) if rng.random() < 0.15 else
+              rng.choice(vocab) if rng.random() < 0.6 else rng.choice(FILLER) for _ in range(60)]
+        paras.append("<p>" + " ".join(ws) + "</p>")
+    anchors = "".join(f'<li><a href="{href}">{text}</a></li>' for href, text in links)
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title} | {host}</title>"
+            f"<meta name='description' content='{title} - {cat} services and schemes'></head><body>"
+            f"<header><nav><a href='/'>Home</a> <a href='/about'>About Us</a> <a href='/contact'>Contact</a></nav></header>"
+            f"<main><h1>{title}</h1>{''.join(paras)}<ul>{anchors}</ul></main>"
+            f"<div class='footer-text'>{''.join('<p>' + b + '</p>' for b in TEMPLATE_BLOCKS)}</div>"
+            f"<footer>Government of India</footer></body></html>")
+
+
+def synthetic_corpus(hosts=20, pages_per_host=50, links_per_page=12, words=300, seed=0):
+    """
+    (seeds, corpus) for a link graph of portals: mostly same-host links plus
+    cross-host ones, PDFs (skipped by extension), extension-less downloads
+    (rejected on Content-Type), 301s to canonical pages and dead links.
+    """
+    rng = random.Random(seed)
+    cats = list(TOPICS)
+    corpus = {}
+    seeds = {c: [] for c in cats}
+    names = [f"portal{h}{REPLAY_SUFFIX}" for h in range(hosts)]
+    for h, host in enumerate(names):
+        cat = cats[h % len(cats)]
+        seeds[cat].append(f"http://{host}/")
+        for i in range(pages_per_host):
+            path = "/" if i == 0 else f"/page/{i}"
+            links = []
+            for _ in range(links_per_page):
+                r = rng.random()
+                if r < 0.65:
+                    links.append((f"/page/{rng.randrange(1, pages_per_host)}", "Read more"))
+                elif r < 0.8:
+                    other = rng.choice(names)
+                    links.append((f"http://{other}/page/{rng.randrange(1, pages_per_host)}", "Related portal"))
+                elif r < 0.87:
+                    links.append((f"/docs/guideline{rng.randrange(50)}.pdf", "Guidelines (PDF)"))
+                elif r < 0.92:
+                    links.append((f"/download?id={rng.randrange(50)}", "Download form"))
+                elif r < 0.97:
+                    links.append((f"/old/{rng.randrange(1, pages_per_host)}", "Archive"))
+                else:
+                    links.append((f"/missing/{rng.randrange(1000)}", "Old notice"))
+            title = f"{cat.title()} {' '.join(rng.sample(TOPICS[cat].split(), 3))} {i}"
+            corpus[host + path] = {"url": f"http://{host}{path}", "status": 200,
+                                   "content_type": "text/html; charset=utf-8",
+                                   "body": _page_html(rng, host, title, cat, links, words)}
+        for d in range(50):
+            corpus[f"{host}/download?id={d}"] = {"url": f"http://{host}/download?id={d}", "status": 200,
+                                                 "content_type": "application/pdf",
+                                                 "body": "%PDF-1.4 " + "0" * 200_000}
+        for i in range(1, pages_per_host):
+            corpus[f"{host}/old/{i}"] = {"url": f"http://{host}/old/{i}", "status": 301,
+                                         "location": f"http://{host}/page/{i}"}
+    return seeds, corpus
+
+
+def save_corpus(path, seeds, corpus):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"seeds": seeds}) + "\n")
+        for entry in corpus.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load_corpus(path):
+    """(seeds, {scheme-less url: entry}) with seed urls rewritten to http://."""
+    corpus = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        seeds = json.loads(f.readline())["seeds"]
+        for line in f:
+            entry = json.loads(line)
+            corpus[_url_key(entry["url"])] = entry
+    seeds = {c: ["http://" + u.split("://", 1)[-1] for u in urls] for c, urls in seeds.items()}
+    return seeds, corpus
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes: without this, Nagle + delayed
+    # ACK adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    corpus = {}
+    latency = 0.0          # seconds, mean; each response waits 0.5x-1.5x of it
+    failure_rate = 0.0
+    failure_status = 503
+    _rng = random.Random(0)
+    _rng_lock = threading.Lock()
+
+    def _send(self, status, ctype=None, body=b"", location=None):
+        self.send_response(status)
+        if ctype:
+            self.send_header("Content-Type", ctype)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def handle(self):
+        # the crawler drops connections it rejects on headers
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        # proxied requests carry the absolute url; direct ones a path + Host
+        url = self.path if "://" in self.path else f"http://{self.headers.get('Host', '')}{self.path}"
+        with self._rng_lock:
+            jitter, fail = self._rng.uniform(0.5, 1.5), self._rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency * jitter)
+        entry = self.corpus.get(_url_key(url))
+        if fail:
+            self._send(self.failure_status, "text/plain", b"injected failure")
+        elif entry is None:
+            self._send(404, "text/plain", b"not found")
+        elif entry["status"] in (301, 302, 303, 307, 308):
+            self._send(entry["status"], location="http://" + entry["location"].split("://", 1)[-1])
+        else:
+            body = entry["body"]
+            if "html" in entry["content_type"]:
+                body = body.replace("https://", "http://")
+            self._send(entry["status"], entry["content_type"], body.encode("utf-8", "replace"))
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(corpus, port=0, latency_ms=0.0, failure_rate=0.0, failure_status=503, seed=0):
+    """Start the replay server in a daemon thread; returns the server (server_address has the port)."""
+    handler = type("Handler", (ReplayHandler,), {
+        "corpus": corpus, "latency": latency_ms / 1000.0, "failure_rate": failure_rate,
+        "failure_status": failure_status, "_rng": random.Random(seed), "_rng_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def record(out, categories=None, max_pages=100):
+    """Crawl the live seed sites once and save every page fetched as a corpus."""
+    from app.src.web_crawler.crawler_spider.crawler import EnhancedCrawler
+    from app.src.web_crawler.crawler_spider.seeds import PRIMARY_SEEDS
+    from benchmarks.corpus import make_workspace
+    make_workspace(0, build=False)
+    crawler = EnhancedCrawler(max_pages=max_pages)
+    corpus = {}
+    fetch = crawler._fetch
+
+    def recording_fetch(url):
+        html = fetch(url)
+        if html:
+            corpus[_url_key(url)] = {"url": url, "status": 200, "content_type": "text/html; charset=utf-8",
+                                     "body": html}
+        return html
+
+    crawler._fetch = recording_fetch
+    crawler.crawl(categories=categories)
+    seeds = {c: urls for c, urls in PRIMARY_SEEDS.items() if not categories or c in categories}
+    save_corpus(out, seeds, corpus)
+    print(f"recorded {len(corpus)} pages to {out}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("synth")
+    p.add_argument("--out", required=True)
+    p.add_argument("--hosts", type=int, default=20)
+    p.add_argument("--pages-per-host", type=int, default=50)
+    p.add_argument("--links-per-page", type=int, default=12)
+    p.add_argument("--words", type=int, default=300)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("record")
+    p.add_argument("--out", required=True)
+    p.add_argument("--categories", nargs="*")
+    p.add_argument("--max-pages", type=int, default=100)
+    p = sub.add_parser("serve")
+    p.add_argument("--corpus", required=True)
+    p.add_argument("--port", type=int, default=0)
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--failure-rate", type=float, default=0.0)
+    p.add_argument("--failure-status", type=int, default=503)
+    args = ap.parse_args()
+    if args.cmd == "synth":
+        seeds, corpus = synthetic_corpus(args.hosts, args.pages_per_host, args.links_per_page, args.words, args.seed)
+        save_corpus(args.out, seeds, corpus)
+        print(f"wrote {len(corpus)} urls to {args.out}")
+    elif args.cmd == "record":
+        record(args.out, args.categories, args.max_pages)
+    else:
+        server = serve(load_corpus(args.corpus)[1], args.port, args.latency_ms, args.failure_rate, args.failure_status)
+        # the first line is read by bench_crawl to find the port
+        print(f"listening on 127.0.0.1:{server.server_address[1]}", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+            sys.exit(0)